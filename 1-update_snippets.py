@@ -1,40 +1,39 @@
+import argparse
+import logging
 import os
-import re
-from pathlib import Path
-from difflib import SequenceMatcher
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
-# Paths
-SNIPPETS_PATH = Path(r"C:\Users\toddk\Documents\MyBrain\Snippets")
-NOTES_PATH = Path(r"C:\Users\toddk\Documents\MyBrain")
+from instrumentation import add_instrumentation_arguments, count, instrumented, phase, progress
+from note_blocks import block_context, fence_for, iter_code_blocks, splice, split_lines
+from similarity_index import SimilarityIndex, SnippetMatcher, match_candidates
+from snippet_corpus import CACHE_FILENAME, load_corpus, parse_snippet, snippet_filename
+from snippet_links import SNIPPET_LINK_REGEX
+from vault_config import add_vault_arguments, vault_paths
+from vault_manifest import EMBEDS_SCOPE, MANIFEST_FILENAME, VaultManifest, find_notes
+from vault_plan import VaultPlan
 
-# Regex to find code blocks in notes
-CODE_BLOCK_REGEX = re.compile(r"```([a-zA-Z]*)\n(.*?)```", re.DOTALL)
-# Regex to extract snippet embed links
-SNIPPET_LINK_REGEX = re.compile(r"!\[\[Snippets/(.*?)\]\]")
+# Paths (see vault_config for the --vault/--snippets options and environment variables)
+NOTES_PATH, SNIPPETS_PATH = vault_paths()
 
 SIMILARITY_THRESHOLD = 0.8  # Threshold for snippet similarity
+NEW_BLOCK_BATCH = 256  # New blocks compared per round before they are resolved
 
-def extract_code(snippet_path):
-    """Extract code content from a snippet file."""
-    with open(snippet_path, "r", encoding="utf-8") as file:
-        content = file.read()
-        match = CODE_BLOCK_REGEX.search(content)
-        if match:
-            return match.group(2).strip()
-    return ""
-
-def compare_code_with_snippets(code, snippet_files):
-    """Compare a code block with all existing snippets."""
-    for snippet_file in snippet_files:
-        snippet_code = extract_code(snippet_file)
-        similarity = SequenceMatcher(None, code, snippet_code).ratio()
-        if similarity >= SIMILARITY_THRESHOLD:
-            return snippet_file.name
+log = logging.getLogger("1-update")
+
+MANIFEST_SCOPE = "update_snippets"  # Name this script records processed notes under
+
+def compare_code_with_snippets(code, language, matcher):
+    """Return ``(snippet_name, similarity)`` for the most similar snippet, or None."""
+    match = matcher.best_match(code, language)
+    if match:
+        snippet, similarity = match
+        return snippet.name, similarity
     return None
 
-def create_snippet(language, code, source_note, context=""):
-    """Create a new snippet file with corrected metadata."""
-    snippet_name = f"{language}_{hash(code)}.md"
+def create_snippet(language, code, source_note, plan, context=""):
+    """Plan a new snippet file with corrected metadata and return it parsed."""
+    snippet_name = snippet_filename(language, code)
     snippet_path = SNIPPETS_PATH / snippet_name
 
     metadata = (
@@ -48,69 +47,287 @@ def create_snippet(language, code, source_note, context=""):
         f"---\n"
     )
 
-    with open(snippet_path, "w", encoding="utf-8") as file:
-        file.write(metadata)
-        file.write(f"```{language}\n{code}\n```")
+    fence = fence_for(code)
+    content = metadata + f"{fence}{language}\n{code}\n{fence}"
+    plan.write(snippet_path, content)
 
-    return snippet_name
+    return parse_snippet(snippet_path, content)
 
-def process_note(note_path, snippet_files):
-    """Process a single note to handle its code blocks."""
+def scan_note(note_path, matcher):
+    """Read a note once and find its code blocks and the best matching existing snippet.
+
+    Returns the note content and a list of
+    ``(block, language, code, context, existing_match)`` tuples, where
+    ``block`` is the ``CodeBlock`` and ``existing_match`` is
+    ``(snippet_name, similarity)`` or None. The list is None if the note
+    already embeds snippets; such notes are left alone.
+    """
     with open(note_path, "r", encoding="utf-8") as file:
         content = file.read()
+    if SNIPPET_LINK_REGEX.search(content):
+        return content, None
+
+    lines, offsets = split_lines(content)
+    blocks = []
+    for block in iter_code_blocks(content, lines, offsets):
+        language = block.language or "plain"
+        code = block.code.strip()
+
+        # Use the text right before the block as context
+        context = " ".join(block_context(lines, block))
+
+        # Identical code already has a snippet under its content-addressed name;
+        # otherwise check if a similar snippet exists
+        snippet_name = snippet_filename(language, code)
+        if snippet_name in matcher.names:
+            existing_match = (snippet_name, 1.0)
+        else:
+            existing_match = compare_code_with_snippets(code, language, matcher)
+
+        blocks.append((block, language, code, context, existing_match))
+
+    return content, blocks
+
+
+_worker_matcher = None
+
+
+def _init_worker(matcher):
+    """Give each worker process its own copy of the existing snippet index."""
+    global _worker_matcher
+    _worker_matcher = matcher
+
+
+def _scan_note_in_worker(note_path):
+    _worker_matcher.stats.clear()
+    return scan_note(note_path, _worker_matcher), _worker_matcher.stats.copy()
+
+
+def scan_notes(note_paths, matcher, workers=1):
+    """Scan notes in order, fanning the work out over ``workers`` processes.
 
-    updated_content = content
-    for match in CODE_BLOCK_REGEX.finditer(content):
-        language = match.group(1) or "plain"
-        code = match.group(2).strip()
+    Pruning counters from the workers are added to ``matcher.stats``.
+    """
+    if workers <= 1:
+        for note_path in note_paths:
+            yield scan_note(note_path, matcher)
+        return
 
-        # Extract surrounding text as context
-        context_start = max(content.rfind("\n", 0, match.start()), 0)
-        context_end = content.find("\n", match.end())
-        context = content[context_start:context_end].strip()
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(matcher,)
+    ) as executor:
+        for scanned, stats in executor.map(_scan_note_in_worker, note_paths, chunksize=16):
+            matcher.stats.update(stats)
+            yield scanned
 
-        # Check if a similar snippet already exists
-        existing_snippet = compare_code_with_snippets(code, snippet_files)
 
-        if existing_snippet:
+def _match_new_block(task):
+    return match_candidates(*task, SIMILARITY_THRESHOLD)
+
+
+def match_new_blocks(pending, workers=1, stats=None, batch_size=NEW_BLOCK_BATCH):
+    """Decide in note order which pending blocks match a snippet created earlier in the run.
+
+    ``pending`` lists ``(snippet_name, language, code, existing_match)`` for
+    every block without an exact existing snippet, in note order. Returns
+    the match each block should use, ``(snippet_name, similarity)`` or None
+    if it becomes a new snippet. Candidates come from an LSH
+    ``SimilarityIndex``; the ``ratio()`` checks of each batch run on
+    ``workers`` processes and the batch is then resolved in order, so the
+    result does not depend on ``workers`` or ``batch_size``. Counters are
+    added to ``stats``.
+    """
+    index = SimilarityIndex()
+    first = {}  # Snippet name -> position of its first pending block
+    for position, (snippet_name, _, code, _) in enumerate(pending):
+        if snippet_name not in first:
+            first[snippet_name] = position
+            index.add(position, code)
+
+    stats = stats if stats is not None else Counter()
+    created = set()
+    matches = []
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 and pending else None
+    try:
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            tasks = []
+            for position, (snippet_name, language, code, _) in enumerate(batch, start):
+                if snippet_name in created:
+                    tasks.append((code, []))
+                    continue
+                # Blocks matching an existing snippet never become new snippets, and
+                # earlier batches are resolved, so only their new snippets count
+                candidates = [
+                    other for other in index.candidates(first[snippet_name])
+                    if (start <= other < position and not pending[other][3])
+                    or (other < start and pending[other][0] in created)
+                ]
+                earlier = sorted(other for other in candidates if pending[other][1] == language)
+                stats["candidates"] += len(candidates)
+                stats["language_pruned"] += len(candidates) - len(earlier)
+                tasks.append((code, [(pending[other][0], pending[other][2]) for other in earlier]))
+
+            if executor:
+                results = executor.map(_match_new_block, tasks, chunksize=16)
+            else:
+                results = map(_match_new_block, tasks)
+            for (snippet_name, _, _, existing_match), (block_matches, block_stats) in zip(batch, results):
+                stats.update(block_stats)
+                if snippet_name in created:
+                    matches.append((snippet_name, 1.0))
+                    continue
+                # Ties go to the snippet created first
+                new_match = max(
+                    ((name, score) for name, score in block_matches if name in created),
+                    key=lambda match: match[1], default=None,
+                )
+                if new_match and (not existing_match or new_match[1] > existing_match[1]):
+                    existing_match = new_match
+                if not existing_match:
+                    created.add(snippet_name)
+                matches.append(existing_match)
+    finally:
+        if executor:
+            executor.shutdown()
+    return matches
+
+
+def process_note(note_path, content, blocks, plan):
+    """Plan replacing a scanned note's code blocks with snippet embeds and return the new content.
+
+    Each block's ``existing_match`` must already include snippets created
+    earlier in the run (see ``match_new_blocks``); blocks without a match
+    become new snippets.
+    """
+    embeds = []
+    for block, language, code, context, existing_match in blocks:
+        if existing_match:
             # Replace code block with an embed link to the existing snippet
-            embed_link = f"![[Snippets/{existing_snippet}]]"
+            embeds.append(f"![[Snippets/{existing_match[0]}]]")
         else:
             # Create a new snippet and replace the code block
-            snippet_name = create_snippet(language, code, note_path.name, context)
-            embed_link = f"![[Snippets/{snippet_name}]]"
-
-            # Add the new snippet to the list of snippet files
-            snippet_files.append(SNIPPETS_PATH / snippet_name)
+            snippet = create_snippet(language, code, note_path.name, plan, context)
+            embeds.append(f"![[Snippets/{snippet.name}]]")
 
-        # Replace the code block in the note with the embed link
-        updated_content = updated_content.replace(match.group(0), embed_link)
+    # Replace each code block in the note with its embed link
+    updated_content = splice(content, [block[0] for block in blocks], embeds)
 
     # Save the updated note
-    with open(note_path, "w", encoding="utf-8") as file:
-        file.write(updated_content)
+    plan.write(note_path, updated_content, original=content)
+
+    return updated_content
+
+def main(argv=None):
+    global NOTES_PATH, SNIPPETS_PATH
+    parser = argparse.ArgumentParser(description="Move code blocks from notes into snippet files.")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of processes used to scan notes (0 = one per CPU core).",
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Only process notes that changed since the last run.",
+    )
+    parser.add_argument(
+        "--apply", action="store_true",
+        help="Write the planned changes (default: only print them).",
+    )
+    add_vault_arguments(parser)
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args(argv)
+    NOTES_PATH, SNIPPETS_PATH = vault_paths(args.vault, args.snippets, parser)
+    workers = args.workers or os.cpu_count()
+
+    with instrumented(args):
+        # Parse all existing snippet files once and index them by language and length
+        with phase("parse"):
+            snippets = load_corpus(SNIPPETS_PATH.glob("*.md"), SNIPPETS_PATH / CACHE_FILENAME)
+        matcher = SnippetMatcher(snippets, SIMILARITY_THRESHOLD)
+        new_stats = Counter()
+
+        with VaultManifest(NOTES_PATH / MANIFEST_FILENAME) as manifest:
+            # Process all notes for new code blocks, in a stable order
+            with phase("scan"):
+                all_notes = find_notes(NOTES_PATH, SNIPPETS_PATH)
+                note_paths = all_notes
+                if args.incremental:
+                    note_paths = manifest.changed(MANIFEST_SCOPE, note_paths)
+                    log.info("%d notes changed since the last run.", len(note_paths))
+
+                # Skip notes the embed index already lists as having snippet embeds
+                # without reading them; notes it has not seen yet are read once by
+                # the scan below, which also skips them if they have embeds
+                stale = set(manifest.changed(EMBEDS_SCOPE, note_paths))
+                with_embeds = manifest.notes_with_embeds()
+                skipped = [
+                    note_path for note_path in note_paths
+                    if note_path not in stale and str(note_path) in with_embeds
+                ]
+                processed = [(note_path, None) for note_path in skipped]
+                skipped = set(skipped)
+                note_paths = [note_path for note_path in note_paths if note_path not in skipped]
+
+            plan = VaultPlan(NOTES_PATH)
+            with phase("compare"):
+                scanned_notes = list(progress(
+                    scan_notes(note_paths, matcher, workers), "Scanning notes", len(note_paths),
+                ))
 
-def main():
-    # Ensure the Snippets folder exists
-    if not SNIPPETS_PATH.exists():
-        SNIPPETS_PATH.mkdir(parents=True)
+                # Blocks without an exact existing snippet may match snippets
+                # created earlier in this run
+                pending = [
+                    (snippet_filename(language, code), language, code, existing_match)
+                    for _, blocks in scanned_notes if blocks is not None
+                    for _, language, code, _, existing_match in blocks
+                    if not existing_match or existing_match[1] < 1.0
+                ]
+                new_matches = iter(match_new_blocks(pending, workers, new_stats))
 
-    # Load all existing snippet files
-    snippet_files = list(SNIPPETS_PATH.glob("*.md"))
+            # Bring the embed index up to date, reusing the notes just read
+            manifest.update_embeds(
+                all_notes, {note_path: content for note_path, (content, _) in zip(note_paths, scanned_notes)},
+            )
 
-    # Process all notes for new code blocks
-    for note_path in NOTES_PATH.rglob("*.md"):
-        with open(note_path, "r", encoding="utf-8") as file:
-            content = file.read()
+            created = set()
+            with phase("plan"):
+                for note_path, (content, blocks) in zip(note_paths, scanned_notes):
+                    if blocks is None:
+                        processed.append((note_path, None))
+                        continue
+                    log.debug("Processing note: %s", note_path)
+                    resolved = []
+                    for block, language, code, context, existing_match in blocks:
+                        if not existing_match or existing_match[1] < 1.0:
+                            existing_match = next(new_matches)
+                            if not existing_match:
+                                created.add(snippet_filename(language, code))
+                        resolved.append((block, language, code, context, existing_match))
+                    updated_content = process_note(note_path, content, resolved, plan)
+                    processed.append((note_path, updated_content))
+            count("files_read", len(note_paths))
 
-        # Skip notes that already have snippet embed links
-        if SNIPPET_LINK_REGEX.search(content):
-            continue
+            plan.summary()
+            if args.apply:
+                plan.apply()
+                for note_path, updated_content in processed:
+                    manifest.record(MANIFEST_SCOPE, note_path, updated_content)
 
-        print(f"Processing note: {note_path}")
-        process_note(note_path, snippet_files)
+                # New snippets are already in their final state
+                for snippet_name in sorted(created):
+                    manifest.record(MANIFEST_SCOPE, SNIPPETS_PATH / snippet_name)
+            else:
+                log.info("Dry run: nothing was written. Run again with --apply to make these changes.")
 
-    print("Finished processing notes.")
+        stats = matcher.stats + new_stats
+        count("comparisons", stats["full_ratio"])
+        log.info(
+            "Similarity checks: %d candidates, %d pruned by language, %d by length, "
+            "%d by quick_ratio(), %d full ratio() comparisons, %d matches.",
+            stats["candidates"], stats["language_pruned"], stats["length_pruned"],
+            stats["quick_ratio_pruned"], stats["full_ratio"], stats["matched"],
+        )
+        log.info("Finished processing notes.")
 
 if __name__ == "__main__":
     main()
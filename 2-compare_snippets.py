@@ -1,74 +1,69 @@
-import os
+import argparse
+import logging
 import re
-from pathlib import Path
-from difflib import SequenceMatcher
 
-# Path to the Snippets folder
-SNIPPETS_PATH = Path(r"C:\Users\toddk\Documents\MyBrain\Snippets")
-SIMILARITY_THRESHOLD = 0.8  # Adjust this threshold as needed (0.8 = 80% similar)
-
-# Regex to extract code content from snippet files
-CODE_BLOCK_REGEX = re.compile(r"```.*?\n(.*?)```", re.DOTALL)
+from instrumentation import add_instrumentation_arguments, instrumented, phase
+from note_blocks import FILENAME_LANGUAGE_REGEX
+from similarity_index import find_similar_pairs
+from snippet_corpus import CACHE_FILENAME, load_corpus
+from vault_config import add_vault_arguments, vault_paths
 
-# Regex to match filenames with the pattern: language_<hash>.md
-FILENAME_PATTERN = re.compile(r"^\w+_[-\d]+\.md$")
+# Path to the Snippets folder (see vault_config for the --vault/--snippets options and environment variables)
+NOTES_PATH, SNIPPETS_PATH = vault_paths()
+SIMILARITY_THRESHOLD = 0.8  # Adjust this threshold as needed (0.8 = 80% similar)
 
+# Regex to match filenames with the pattern: language_<hash>.md, where <hash> is
+# either a legacy hash() integer or a 16-character BLAKE2b hex digest and the
+# language is anything snippet_filename allows (c++, objective-c, csharp, ...)
+FILENAME_PATTERN = re.compile(rf"^{FILENAME_LANGUAGE_REGEX.pattern}_(?:[-\d]+|[0-9a-f]{{16}})\.md$")
 
-def extract_code(snippet_path):
-    """Extract code content from a snippet file."""
-    with open(snippet_path, "r", encoding="utf-8") as file:
-        content = file.read()
-        match = CODE_BLOCK_REGEX.search(content)
-        if match:
-            return match.group(1).strip()
-    return ""
+log = logging.getLogger("2-compare")
 
 
 def compare_snippets(snippet_files):
     """Compare all snippets for similarity and return pairs of similar files."""
-    similar_pairs = []
-
-    for i in range(len(snippet_files)):
-        code_a = extract_code(snippet_files[i])
-        for j in range(i + 1, len(snippet_files)):
-            code_b = extract_code(snippet_files[j])
-            similarity = SequenceMatcher(None, code_a, code_b).ratio()
-            if similarity >= SIMILARITY_THRESHOLD:
-                similar_pairs.append((
-                    snippet_files[i],
-                    snippet_files[j],
-                    similarity
-                ))
-    return similar_pairs
-
-
-def main():
-    # Ensure the Snippets folder exists
-    if not SNIPPETS_PATH.exists():
-        print(f"Error: The directory {SNIPPETS_PATH} does not exist.")
-        return
-
-    print(f"Directory exists: {SNIPPETS_PATH}")
-    print("Contents:", list(SNIPPETS_PATH.iterdir()))
-
-    # Get all snippet files matching the pattern
-    snippet_files = [f for f in SNIPPETS_PATH.iterdir() if FILENAME_PATTERN.match(f.name)]
-    print("Matching files:", [f.name for f in snippet_files])
-
-    if not snippet_files:
-        print("No snippet files found.")
-        return
-
-    print(f"Found {len(snippet_files)} snippet files. Comparing for similarity...")
-    similar_pairs = compare_snippets(snippet_files)
-
-    # Output similar pairs
-    if similar_pairs:
-        print(f"Found {len(similar_pairs)} similar snippet pairs:")
-        for file_a, file_b, similarity in similar_pairs:
-            print(f"- {file_a.name} and {file_b.name} (Similarity: {similarity:.2f})")
-    else:
-        print("No similar snippets found.")
+    with phase("parse"):
+        snippets = load_corpus(snippet_files, SNIPPETS_PATH / CACHE_FILENAME)
+    codes = [snippet.code for snippet in snippets]
+    with phase("compare"):
+        return [
+            (snippet_files[i], snippet_files[j], similarity)
+            for i, j, similarity in find_similar_pairs(codes, SIMILARITY_THRESHOLD)
+        ]
+
+
+def main(argv=None):
+    global NOTES_PATH, SNIPPETS_PATH
+    parser = argparse.ArgumentParser(description="Report pairs of similar snippets.")
+    add_vault_arguments(parser)
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args(argv)
+    NOTES_PATH, SNIPPETS_PATH = vault_paths(args.vault, args.snippets, parser)
+
+    with instrumented(args):
+        # Ensure the Snippets folder exists
+        if not SNIPPETS_PATH.exists():
+            log.error("The directory %s does not exist.", SNIPPETS_PATH)
+            return
+
+        # Get all snippet files matching the pattern
+        with phase("scan"):
+            snippet_files = [f for f in SNIPPETS_PATH.iterdir() if FILENAME_PATTERN.match(f.name)]
+
+        if not snippet_files:
+            log.info("No snippet files found.")
+            return
+
+        log.info("Found %d snippet files in %s. Comparing for similarity...", len(snippet_files), SNIPPETS_PATH)
+        similar_pairs = compare_snippets(snippet_files)
+
+        # Output similar pairs
+        if similar_pairs:
+            print(f"Found {len(similar_pairs)} similar snippet pairs:")
+            for file_a, file_b, similarity in similar_pairs:
+                print(f"- {file_a.name} and {file_b.name} (Similarity: {similarity:.2f})")
+        else:
+            print("No similar snippets found.")
 
 
 if __name__ == "__main__":
@@ -1,131 +1,318 @@
+import argparse
+import hashlib
+import logging
 import os
-import re
 from pathlib import Path
-from difflib import SequenceMatcher
 import json
 
-# Paths
-SNIPPETS_PATH = Path(r"C:\Users\toddk\Documents\MyBrain\Snippets")
-NOTES_PATH = Path(r"C:\Users\toddk\Documents\MyBrain")
-REPORT_PATH = Path(r"C:\Users\toddk\Documents\deduplication_report.txt")
-PROGRESS_FILE = Path(r"C:\Users\toddk\Documents\deduplication_progress.json")
+from instrumentation import add_instrumentation_arguments, count, instrumented, phase, progress
+from similarity_index import SimilarityIndex
+from snippet_clusters import CANONICAL_POLICIES, cluster_mapping, cluster_snippets
+from snippet_corpus import CACHE_FILENAME, load_corpus
+from snippet_links import rewrite_snippet_links
+from vault_config import add_vault_arguments, reports_path, vault_paths
+from vault_manifest import MANIFEST_FILENAME, VaultManifest, find_notes
+from vault_plan import VaultPlan
 
-# Regex to extract snippet embed links from notes
-SNIPPET_LINK_REGEX = re.compile(r"!\[\[Snippets/(.*?)\]\]")
-
-# Regex to extract code content from snippet files
-CODE_BLOCK_REGEX = re.compile(r"```.*?\n(.*?)```", re.DOTALL)
+# Paths (see vault_config for the --vault/--snippets options and environment variables)
+NOTES_PATH, SNIPPETS_PATH = vault_paths()
+REPORT_FILENAME = "deduplication_report.txt"
+PROGRESS_FILENAME = "deduplication_progress.jsonl"
+REPORT_PATH = reports_path(NOTES_PATH) / REPORT_FILENAME
+PROGRESS_FILE = reports_path(NOTES_PATH) / PROGRESS_FILENAME
 
 # Thresholds
 SIMILARITY_THRESHOLD_DEDUP = 1.00
 SIMILARITY_THRESHOLD_REPORT = 0.90
 
+CANONICAL_POLICY = "referenced"  # Which snippet each cluster keeps (see snippet_clusters)
 
-def extract_code(snippet_path):
-    """Extract code content from a snippet file."""
-    with open(snippet_path, "r", encoding="utf-8") as file:
-        content = file.read()
-        match = CODE_BLOCK_REGEX.search(content)
-        if match:
-            return match.group(1).strip()
-    return ""
+CHECKPOINT_EVERY = 50  # Processed snippets per checkpoint flush
 
+MANIFEST_SCOPE = "dedup"  # Name this script records processed snippets under
 
-def find_snippet_references(note_path, snippet_name):
-    """Find all references to a snippet in a note."""
-    with open(note_path, "r", encoding="utf-8") as file:
-        content = file.read()
-        return list(SNIPPET_LINK_REGEX.finditer(content)), content
+log = logging.getLogger("3-dedup")
 
 
-def replace_snippet_references(note_path, old_snippet, new_snippet):
-    """Replace references to an old snippet with a new snippet."""
-    matches, content = find_snippet_references(note_path, old_snippet)
-    if matches:
-        updated_content = content.replace(f"![[Snippets/{old_snippet}]]", f"![[Snippets/{new_snippet}]]")
-        with open(note_path, "w", encoding="utf-8") as file:
-            file.write(updated_content)
+def update_notes(snippet_mapping, plan, manifest):
+    """Plan replacing old snippet references with new ones.
 
+    ``snippet_mapping`` must be flat (no target is itself a key), so each
+    note is rewritten in one pass. Only the notes the embed index lists as
+    embedding a mapped snippet are read; the index must be up to date.
+    """
+    if not snippet_mapping:
+        return
 
-def update_notes(snippet_mapping):
-    """Update notes to replace old snippet references with new ones."""
-    for note_path in NOTES_PATH.rglob("*.md"):
-        for old_snippet, new_snippet in snippet_mapping.items():
-            print(f"Updating note: {note_path} (Replacing {old_snippet} with {new_snippet})")
-            replace_snippet_references(note_path, old_snippet, new_snippet)
+    note_paths = sorted({
+        note for duplicate in snippet_mapping for note in manifest.notes_embedding(duplicate)
+    })
 
+    total_replaced = 0
+    for note_path in map(Path, note_paths):
+        with open(note_path, "r", encoding="utf-8") as file:
+            content = file.read()
+        count("files_read")
+        updated_content, replaced = rewrite_snippet_links(content, snippet_mapping)
+        if replaced:
+            plan.write(note_path, updated_content, original=content)
+            total_replaced += replaced
+            log.debug("Updated note: %s (%d references replaced)", note_path, replaced)
+    log.info("Replaced %d snippet references in %d notes.", total_replaced, len(note_paths))
 
-def save_progress(processed_snippets):
-    """Save progress to a JSON file."""
-    with open(PROGRESS_FILE, "w", encoding="utf-8") as file:
-        json.dump(list(processed_snippets), file)
 
+def group_exact_duplicates(snippets):
+    """Group snippets by the hash of their normalized code, in file order."""
+    groups = {}
+    for snippet in snippets:
+        groups.setdefault(snippet.code_hash, []).append(snippet)
+    return list(groups.values())
 
-def load_progress():
-    """Load progress from a JSON file."""
-    if PROGRESS_FILE.exists():
-        with open(PROGRESS_FILE, "r", encoding="utf-8") as file:
-            return set(json.load(file))
-    return set()
 
+def snippet_set_fingerprint(snippets, threshold):
+    """Hash the snippet names, code and comparison threshold so a checkpoint is only resumed for the same run."""
+    digest = hashlib.sha256(f"{threshold}\n".encode("utf-8"))
+    for snippet in snippets:
+        digest.update(f"{snippet.name}\0{snippet.code_hash}\n".encode("utf-8"))
+    return digest.hexdigest()
 
-def main():
-    # Step 1: Gather all snippet files
-    snippet_files = list(SNIPPETS_PATH.glob("*.md"))
-    if not snippet_files:
-        print("No snippet files found.")
-        return
 
-    # Load progress
-    processed_snippets = load_progress()
-
-    # Step 2: Compare snippets for similarity
-    similar_pairs = []
-    snippet_mapping = {}
-
-    total_snippets = len(snippet_files)
-    for i, snippet_a in enumerate(snippet_files):
-        if snippet_a.name in processed_snippets:
-            continue
-
-        code_a = extract_code(snippet_a)
-        for snippet_b in snippet_files[i + 1:]:
-            code_b = extract_code(snippet_b)
-            similarity = SequenceMatcher(None, code_a, code_b).ratio()
-
-            if similarity >= SIMILARITY_THRESHOLD_DEDUP:
-                similar_pairs.append((snippet_a.name, snippet_b.name, similarity))
-                # Mark the duplicate for deduplication (keep snippet_a as primary)
-                snippet_mapping[snippet_b.name] = snippet_a.name
-            elif SIMILARITY_THRESHOLD_REPORT <= similarity < SIMILARITY_THRESHOLD_DEDUP:
-                similar_pairs.append((snippet_a.name, snippet_b.name, similarity))
-
-        # Save progress after processing each snippet
-        processed_snippets.add(snippet_a.name)
-        save_progress(processed_snippets)
-
-        # Print progress
-        if (i + 1) % 10 == 0 or i + 1 == total_snippets:
-            print(f"Processed {i + 1}/{total_snippets} snippets...")
-
-    # Step 3: Update notes
-    update_notes(snippet_mapping)
-
-    # Step 4: Delete duplicate snippet files
-    for duplicate in snippet_mapping.keys():
-        duplicate_path = SNIPPETS_PATH / duplicate
-        if duplicate_path.exists():
-            print(f"Deleting duplicate snippet: {duplicate}")
-            duplicate_path.unlink()
-
-    # Step 5: Generate report for high similarity pairs
-    with open(REPORT_PATH, "w", encoding="utf-8") as report_file:
-        report_file.write("Snippets with 90-99% similarity:\n\n")
-        for snippet_a, snippet_b, similarity in similar_pairs:
-            if SIMILARITY_THRESHOLD_REPORT <= similarity < SIMILARITY_THRESHOLD_DEDUP:
-                report_file.write(f"{snippet_a} and {snippet_b} (Similarity: {similarity:.2f})\n")
-
-    print("Deduplication complete. Report saved at:", REPORT_PATH)
+class CheckpointJournal:
+    """Append-only JSONL journal of dedup decisions.
+
+    The first line records the snippet-set fingerprint; every following
+    line records one processed snippet and the near-duplicate pairs it
+    produced. Lines are buffered and flushed (with
+    fsync) every ``flush_every`` snippets. A torn last line from a crash is
+    dropped on load, so a resumed run reproduces an uninterrupted one.
+    """
+
+    def __init__(self, path, fingerprint, flush_every=CHECKPOINT_EVERY):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.flush_every = flush_every
+        self.buffer = []
+        self.file = None
+
+    def load(self):
+        """Return ``pairs_by_snippet`` from a matching journal, or None."""
+        if not self.path.exists():
+            return None
+
+        matched = False
+        pairs_by_snippet = {}
+        valid_bytes = 0
+        with open(self.path, "rb") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                if not matched:
+                    if record.get("fingerprint") != self.fingerprint:
+                        return None
+                    matched = True
+                else:
+                    pairs_by_snippet[record["snippet"]] = [tuple(pair) for pair in record["pairs"]]
+                valid_bytes += len(line)
+
+        if not matched:
+            return None
+
+        # Cut off a partially written last line before appending to the journal
+        with open(self.path, "r+b") as file:
+            file.truncate(valid_bytes)
+        self.file = open(self.path, "a", encoding="utf-8")
+        return pairs_by_snippet
+
+    def start(self):
+        """Begin a fresh journal for this snippet set."""
+        self.file = open(self.path, "w", encoding="utf-8")
+        self.file.write(json.dumps({"fingerprint": self.fingerprint}) + "\n")
+        self.flush()
+
+    def record(self, snippet_name, pairs):
+        """Journal a processed snippet and the pairs it produced."""
+        self.buffer.append(json.dumps({"snippet": snippet_name, "pairs": pairs}) + "\n")
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self.file.writelines(self.buffer)
+        self.buffer.clear()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+    def discard(self):
+        """Remove the journal once the run has completed."""
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+
+def main(argv=None):
+    global NOTES_PATH, SNIPPETS_PATH, REPORT_PATH, PROGRESS_FILE
+    parser = argparse.ArgumentParser(description="Deduplicate snippets and report near-duplicates.")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Do nothing if no snippet changed since the last run.",
+    )
+    parser.add_argument(
+        "--checkpoint-every", type=int, default=CHECKPOINT_EVERY,
+        help="Number of processed snippets between checkpoint flushes.",
+    )
+    parser.add_argument(
+        "--apply", action="store_true",
+        help="Rewrite notes and delete duplicates (default: only print the plan).",
+    )
+    parser.add_argument(
+        "--canonical", choices=sorted(CANONICAL_POLICIES), default=CANONICAL_POLICY,
+        help=f"Which snippet each cluster keeps: the oldest file, the most embedded one or the "
+             f"longest (default: {CANONICAL_POLICY}).",
+    )
+    parser.add_argument(
+        "--merge-near", type=float, nargs="?", const=SIMILARITY_THRESHOLD_REPORT, metavar="THRESHOLD",
+        help=f"Also merge near-duplicates at or above THRESHOLD into their cluster "
+             f"(default THRESHOLD: {SIMILARITY_THRESHOLD_REPORT}).",
+    )
+    add_vault_arguments(parser)
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args(argv)
+    NOTES_PATH, SNIPPETS_PATH = vault_paths(args.vault, args.snippets, parser)
+    REPORT_PATH = reports_path(NOTES_PATH) / REPORT_FILENAME
+    PROGRESS_FILE = reports_path(NOTES_PATH) / PROGRESS_FILENAME
+    compare_threshold = min(SIMILARITY_THRESHOLD_REPORT, args.merge_near or SIMILARITY_THRESHOLD_REPORT)
+
+    with instrumented(args):
+        # Step 1: Gather all snippet files, in a stable order
+        with phase("scan"):
+            snippet_files = sorted(SNIPPETS_PATH.glob("*.md"))
+            if not snippet_files:
+                log.info("No snippet files found.")
+                return
+
+            manifest = VaultManifest(NOTES_PATH / MANIFEST_FILENAME)
+            if args.incremental and not manifest.changed(MANIFEST_SCOPE, snippet_files):
+                manifest.close()
+                log.info("No snippets changed since the last run.")
+                return
+
+            # The embed index gives the reference counts and the notes to rewrite
+            manifest.update_embeds(find_notes(NOTES_PATH, SNIPPETS_PATH))
+
+        # Parse every snippet once
+        with phase("parse"):
+            snippets = load_corpus(snippet_files, SNIPPETS_PATH / CACHE_FILENAME)
+
+        # Step 2: Join exact duplicates; the first snippet of each code hash
+        # stands in for its group in the fuzzy comparison
+        exact_groups = group_exact_duplicates(snippets)
+        representatives = [group[0] for group in exact_groups]
+        linked = [(group[0].name, duplicate.name) for group in exact_groups for duplicate in group[1:]]
+        log.info("Found %d exact duplicates among %d snippets.", len(linked), len(snippets))
+
+        # Resume from the checkpoint journal if it belongs to this snippet set
+        journal = CheckpointJournal(
+            PROGRESS_FILE, snippet_set_fingerprint(snippets, compare_threshold), args.checkpoint_every,
+        )
+        pairs_by_snippet = journal.load()
+        if pairs_by_snippet is not None:
+            log.info("Resuming: %d snippets already processed.", len(pairs_by_snippet))
+        else:
+            pairs_by_snippet = {}
+            journal.start()
+
+        # Step 3: Fuzzy-compare the remaining snippets for the report band
+        # (and the merge band, if it is wider); only LSH candidates get an
+        # exact comparison
+        with phase("compare"):
+            index = SimilarityIndex()
+            for i, snippet in enumerate(representatives):
+                index.add(i, snippet.code)
+
+            total_snippets = len(representatives)
+            for i, snippet_a in progress(enumerate(representatives), "Comparing", total_snippets):
+                if snippet_a.name in pairs_by_snippet:
+                    continue
+
+                later = range(i + 1, total_snippets)
+                pairs = [
+                    (snippet_a.name, representatives[j].name, similarity)
+                    for j, similarity in sorted(index.similar(i, compare_threshold, later))
+                    if similarity < SIMILARITY_THRESHOLD_DEDUP
+                ]
+
+                # Journal the snippet together with the pairs it produced
+                pairs_by_snippet[snippet_a.name] = pairs
+                journal.record(snippet_a.name, pairs)
+
+        journal.close()
+        similar_pairs = [
+            pair for snippet in representatives for pair in pairs_by_snippet[snippet.name]
+        ]
+
+        # Step 4: Cluster the similarity graph and keep one snippet per cluster
+        if args.merge_near is not None:
+            linked += [(a, b) for a, b, similarity in similar_pairs if similarity >= args.merge_near]
+        clusters = cluster_snippets(snippets, linked)
+        snippet_mapping, canonical_names = cluster_mapping(clusters, args.canonical, manifest.embed_counts())
+        log.info(
+            "Grouped %d snippets into %d clusters; keeping the %s snippet of each.",
+            len(snippet_mapping) + len(clusters), len(clusters), args.canonical,
+        )
+
+        # Step 5: Plan the note updates, one rewrite per note
+        plan = VaultPlan(NOTES_PATH)
+        with phase("rewrite"):
+            update_notes(snippet_mapping, plan, manifest)
+
+        # Step 6: Plan deleting the snippets that were merged into another
+        for duplicate in snippet_mapping.keys():
+            plan.delete(SNIPPETS_PATH / duplicate)
+
+        # Step 7: Generate report for high similarity pairs and the merged clusters
+        with open(REPORT_PATH, "w", encoding="utf-8") as report_file:
+            report_file.write("Snippets with 90-99% similarity:\n\n")
+            for snippet_a, snippet_b, similarity in similar_pairs:
+                if SIMILARITY_THRESHOLD_REPORT <= similarity < SIMILARITY_THRESHOLD_DEDUP:
+                    merged = snippet_mapping.get(snippet_a, snippet_a) == snippet_mapping.get(snippet_b, snippet_b)
+                    report_file.write(
+                        f"{snippet_a} and {snippet_b} (Similarity: {similarity:.2f})"
+                        + (" [merged]\n" if merged else "\n")
+                    )
+
+            report_file.write(f"\nClusters kept by the {args.canonical} policy:\n\n")
+            for cluster, canonical_name in zip(clusters, canonical_names):
+                merged_names = ", ".join(snippet.name for snippet in cluster if snippet.name != canonical_name)
+                report_file.write(f"{canonical_name} <- {merged_names}\n")
+
+        # The run is complete; the next run starts from scratch
+        journal.discard()
+
+        plan.summary()
+        if not args.apply:
+            manifest.close()
+            log.info("Dry run: nothing was changed. Run again with --apply to make these changes.")
+            log.info("Report saved at: %s", REPORT_PATH)
+            return
+        plan.apply()
+
+        # Remember the surviving snippets for the next incremental run, and the
+        # rewritten notes' embeds so the next lookup does not re-read them
+        with manifest:
+            for snippet_path in SNIPPETS_PATH.glob("*.md"):
+                manifest.record(MANIFEST_SCOPE, snippet_path)
+            for note_path, content in plan.writes.items():
+                manifest.refresh_embeds(note_path, content)
+
+        log.info("Deduplication complete. Report saved at: %s", REPORT_PATH)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,216 @@
+"""Benchmark the snippet scripts on synthetic vaults.
+
+For each scale (number of notes) a vault is generated once with
+``synthetic_vault`` and kept in the work folder, so later runs reuse it.
+Every script then runs in its own subprocess on a fresh copy of that
+vault, and its wall time, peak RSS and file I/O are written to a JSON
+file. With ``--baseline`` the wall times are compared to an earlier
+results file.
+
+Peak RSS comes from ``wait4`` and the I/O counts from ``/proc/self/io``
+of the script process (reaped worker processes included), so the
+measurements need Linux.
+
+Usage:
+    python benchmark_snippets.py --scales 1000,10000,50000 -o benchmark.json
+    python benchmark_snippets.py --scales 1000 --baseline benchmark.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic_vault import generate_vault
+
+SCRIPTS_PATH = Path(__file__).resolve().parent
+
+# Benchmark name -> (script, options it accepts)
+SCRIPTS = {
+    "obsidian_snippets": ("obsidian_snippets.py", {"workers", "apply"}),
+    "1-update": ("1-update_snippets.py", {"workers", "apply"}),
+    "2-compare": ("2-compare_snippets.py", set()),
+    "3-dedup": ("3-dedup.py", {"apply"}),
+}
+DEFAULT_SCALES = "1000,10000,50000"
+
+# Runs a script as __main__ and copies its /proc/self/io to argv[1] on exit
+CHILD = (
+    "import atexit, os, runpy, shutil, sys\n"
+    "atexit.register(shutil.copyfile, '/proc/self/io', sys.argv[1])\n"
+    "sys.argv = sys.argv[2:]\n"
+    "sys.path[0] = os.path.dirname(sys.argv[0])\n"
+    "runpy.run_path(sys.argv[0], run_name='__main__')\n"
+)
+
+
+def read_io(path):
+    """Parse a copy of /proc/<pid>/io into a dict of counters."""
+    counters = {}
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            key, _, value = line.partition(":")
+            counters[key.strip()] = int(value)
+    return counters
+
+
+def vault_for(work_path, notes, options):
+    """Return the synthetic vault for ``notes``, generating it on first use."""
+    vault_path = work_path / (
+        f"vault_{notes}_{options.blocks}_{options.duplicates}_{options.near_duplicates}"
+        f"_{options.snippet_rate}_{options.seed}"
+    )
+    marker = vault_path / ".generated"
+    if not marker.exists():
+        shutil.rmtree(vault_path, ignore_errors=True)
+        start = time.perf_counter()
+        generate_vault(
+            vault_path, notes, options.blocks, options.duplicates,
+            options.near_duplicates, options.snippet_rate, options.seed,
+        )
+        marker.touch()
+        print(f"Generated vault with {notes} notes in {time.perf_counter() - start:.1f}s: {vault_path}")
+    return vault_path
+
+
+def run_script(name, vault_path, run_path, options):
+    """Run one script on a fresh copy of the vault and return its measurements."""
+    script, accepted = SCRIPTS[name]
+    shutil.rmtree(run_path, ignore_errors=True)
+    run_path.mkdir(parents=True)
+    vault_copy = run_path / "vault"
+    shutil.copytree(vault_path, vault_copy, ignore=shutil.ignore_patterns(".generated"))
+
+    args = ["--vault", str(vault_copy), "--snippets", str(vault_copy / "Snippets")]
+    if "workers" in accepted:
+        args += ["--workers", str(options.workers)]
+    if "apply" in accepted and options.apply:
+        args.append("--apply")
+    io_path = run_path / "io.txt"
+    command = [sys.executable, "-c", CHILD, str(io_path), str(SCRIPTS_PATH / script)] + args
+    env = dict(os.environ, REPORTS_PATH=str(run_path))
+
+    with open(run_path / "output.log", "w", encoding="utf-8") as log:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT, env=env, cwd=run_path)
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    io = read_io(io_path) if io_path.exists() else {}
+    return {
+        "script": name,
+        "args": args[4:],
+        "returncode": process.returncode,
+        "wall_seconds": round(wall, 3),
+        "user_seconds": round(usage.ru_utime, 3),
+        "system_seconds": round(usage.ru_stime, 3),
+        "max_rss_mb": round(usage.ru_maxrss / 1024, 1),
+        "read_calls": io.get("syscr"),
+        "write_calls": io.get("syscw"),
+        "read_bytes": io.get("rchar"),
+        "write_bytes": io.get("wchar"),
+        "disk_read_bytes": io.get("read_bytes"),
+        "disk_write_bytes": io.get("write_bytes"),
+    }
+
+
+def load_baseline(path):
+    """Map ``(notes, script)`` to wall time from an earlier results file."""
+    with open(path, "r", encoding="utf-8") as file:
+        results = json.load(file)["results"]
+    return {(result["notes"], result["script"]): result["wall_seconds"] for result in results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the snippet scripts on synthetic vaults.")
+    parser.add_argument(
+        "--scales", default=DEFAULT_SCALES,
+        help=f"Comma-separated note counts to benchmark (default: {DEFAULT_SCALES}).",
+    )
+    parser.add_argument(
+        "--scripts", default=",".join(SCRIPTS),
+        help=f"Comma-separated scripts to run (default: {','.join(SCRIPTS)}).",
+    )
+    parser.add_argument("--blocks", type=int, default=3, help="Code blocks per note (default: 3).")
+    parser.add_argument("--duplicates", type=float, default=0.2, help="Exact duplicate rate (default: 0.2).")
+    parser.add_argument("--near-duplicates", type=float, default=0.1, help="Near-duplicate rate (default: 0.1).")
+    parser.add_argument(
+        "--snippet-rate", type=float, default=0.5,
+        help="Share of blocks already in snippet files (default: 0.5).",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the vaults (default: 0).")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="--workers passed to the scripts that accept it (default: 1).",
+    )
+    parser.add_argument("--apply", action="store_true", help="Run the scripts with --apply instead of dry runs.")
+    parser.add_argument(
+        "--work", default=str(Path(tempfile.gettempdir()) / "snippet_benchmark"),
+        help="Folder for the generated vaults and run copies.",
+    )
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="JSON file to write.")
+    parser.add_argument("--baseline", help="Earlier results file to compare wall times with.")
+    args = parser.parse_args(argv)
+
+    if not Path("/proc/self/io").exists():
+        print("Error: The benchmark needs Linux (/proc/self/io and wait4).")
+        return
+    scripts = [name.strip() for name in args.scripts.split(",") if name.strip()]
+    unknown = [name for name in scripts if name not in SCRIPTS]
+    if unknown:
+        print(f"Error: Unknown scripts: {', '.join(unknown)}")
+        return
+    baseline = load_baseline(args.baseline) if args.baseline else {}
+
+    work_path = Path(args.work)
+    work_path.mkdir(parents=True, exist_ok=True)
+    results = []
+    for notes in [int(scale) for scale in args.scales.split(",")]:
+        vault_path = vault_for(work_path, notes, args)
+        for name in scripts:
+            result = run_script(name, vault_path, work_path / "run", args)
+            result["notes"] = notes
+            results.append(result)
+
+            line = (
+                f"{notes:>7} notes  {name:<18} {result['wall_seconds']:8.2f}s  "
+                f"{result['max_rss_mb']:8.1f} MB  {result['read_calls']} reads  {result['write_calls']} writes"
+            )
+            if (notes, name) in baseline:
+                line += f"  ({result['wall_seconds'] / baseline[notes, name]:.2f}x baseline)"
+            if result["returncode"]:
+                line += f"  FAILED (exit {result['returncode']})"
+            print(line)
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "vault": {
+                    "blocks": args.blocks,
+                    "duplicates": args.duplicates,
+                    "near_duplicates": args.near_duplicates,
+                    "snippet_rate": args.snippet_rate,
+                    "seed": args.seed,
+                },
+                "workers": args.workers,
+                "apply": args.apply,
+                "results": results,
+            },
+            file,
+            indent=2,
+        )
+    print(f"Results saved at: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,318 @@
 # Ensure this is done:  python -m pip install Pillow
+# For instant --watch reactions:  python -m pip install watchdog  (otherwise the folder is polled)
 # I could do this if I have many to convert:  mkdir webp_to_png cd webp_to_png
 
-from PIL import Image
+import argparse
 import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # Watch mode falls back to polling
+    FileSystemEventHandler = Observer = None
 
 # Define the directory to monitor
 downloads_dir = "C:/Users/toddk/Downloads"
-# Monitor for any .webp files
-for filename in os.listdir(downloads_dir):
-    if filename.endswith(".webp"):
-        webp_path = os.path.join(downloads_dir, filename)
-        png_path = webp_path.replace(".webp", ".png")
 
-        # Open and convert .webp to .png
+# Output formats: file suffix and Pillow format name
+FORMATS = {
+    "png": (".png", "PNG"),
+    "webp-lossless": (".lossless.webp", "WEBP"),
+    "avif": (".avif", "AVIF"),
+}
+
+# Watch mode timing (seconds)
+DEBOUNCE_SECONDS = 0.3  # A download must keep the same size/mtime this long before converting
+POLL_INTERVAL = 0.5  # Directory rescan interval when watchdog is not installed
+TICK = 0.1  # How often settling files and finished conversions are checked
+
+
+def is_webp_source(path):
+    """True for .webp files that are not our own lossless-WebP outputs."""
+    name = path.name.lower()
+    return name.endswith(".webp") and not name.endswith(FORMATS["webp-lossless"][0])
+
+
+def find_webp_files(inputs, recursive=False):
+    """Collect .webp files from the given files and directories, in a stable order."""
+    found = []
+    for input_path in map(Path, inputs):
+        if input_path.is_dir():
+            pattern = "**/*" if recursive else "*"
+            found.extend(
+                (input_path, path) for path in input_path.glob(pattern)
+                if path.is_file() and is_webp_source(path)
+            )
+        elif input_path.suffix.lower() == ".webp":
+            found.append((input_path.parent, input_path))
+    return sorted(found)
+
+
+def output_path(root, webp_path, target, output_dir=None):
+    """Return where the converted image goes: next to the source, or mirrored under output_dir."""
+    suffix = FORMATS[target][0]
+    name = webp_path.name[: -len(webp_path.suffix)] + suffix
+    if output_dir is None:
+        return webp_path.with_name(name)
+    return Path(output_dir) / webp_path.relative_to(root).with_name(name)
+
 
+def is_up_to_date(webp_path, out_path):
+    """True if the output exists and is at least as new as its source."""
+    try:
+        return out_path.stat().st_mtime >= webp_path.stat().st_mtime
+    except FileNotFoundError:
+        return False
+
+
+def save_options(target, compress_level=6, optimize=False, quality=80):
+    """Pillow save() keyword arguments for the target format."""
+    if target == "png":
+        return {"compress_level": compress_level, "optimize": optimize}
+    if target == "webp-lossless":
+        return {"lossless": True, "quality": quality, "method": 6 if optimize else 4}
+    return {"quality": quality}
+
+
+def convert_image(job):
+    """Convert one image, writing via a temp file so readers never see a partial output.
+
+    Returns (bytes_in, bytes_out).
+    """
+    webp_path, out_path, target, options = job
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(out_path.name + ".part")
+
+    try:
         with Image.open(webp_path) as img:
-            img.save(png_path, "PNG")
-        print(f"Converted {filename} to PNG format.")
+            if target == "avif" and img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA")
+            img.save(tmp_path, FORMATS[target][1], **options)
+        os.replace(tmp_path, out_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    return webp_path.stat().st_size, out_path.stat().st_size
+
+
+def convert_all(files, target="png", output_dir=None, options=None, workers=None, force=False):
+    """Convert (root, webp_path) pairs on a process pool and print a throughput summary."""
+    options = options or save_options(target)
+    jobs = []
+    skipped = 0
+    for root, webp_path in files:
+        out_path = output_path(root, webp_path, target, output_dir)
+        if not force and is_up_to_date(webp_path, out_path):
+            skipped += 1
+            continue
+        jobs.append((webp_path, out_path, target, options))
+
+    converted = failed = bytes_in = bytes_out = 0
+    start = time.perf_counter()
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(convert_image, job) for job in jobs]
+            for job, future in zip(jobs, futures):
+                try:
+                    size_in, size_out = future.result()
+                except Exception as error:  # e.g. Pillow's DecompressionBombError
+                    failed += 1
+                    print(f"Failed to convert {job[0]}: {error}")
+                    continue
+                converted += 1
+                bytes_in += size_in
+                bytes_out += size_out
+                print(f"Converted {job[0].name} to {target.upper()} format.")
+    elapsed = time.perf_counter() - start
+
+    rate = converted / elapsed if elapsed else 0.0
+    print(
+        f"Converted {converted} images ({skipped} up to date, {failed} failed) "
+        f"in {elapsed:.2f}s: {rate:.1f} images/s, "
+        f"{bytes_in / 1e6:.1f} MB in, {bytes_out / 1e6:.1f} MB out."
+    )
+    return converted, skipped, failed
+
+
+if Observer is not None:
+    class WebpEventHandler(FileSystemEventHandler):
+        """Forward created, modified and renamed-to paths to a queue."""
+
+        def __init__(self, events):
+            super().__init__()
+            self.events = events
+
+        def on_created(self, event):
+            if not event.is_directory:
+                self.events.put(event.src_path)
+
+        def on_modified(self, event):
+            if not event.is_directory:
+                self.events.put(event.src_path)
+
+        def on_moved(self, event):
+            if not event.is_directory:
+                self.events.put(event.dest_path)
+
+
+def snapshot(roots, recursive=False):
+    """Map every .webp source under the roots to its (size, mtime_ns)."""
+    files = {}
+    for root in roots:
+        for root_dir, dirs, names in os.walk(root):
+            if not recursive:
+                dirs.clear()
+            for name in names:
+                path = Path(root_dir) / name
+                if is_webp_source(path):
+                    try:
+                        stat = path.stat()
+                    except FileNotFoundError:
+                        continue
+                    files[path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def watch(roots, target="png", output_dir=None, options=None, workers=None, recursive=False,
+          debounce=DEBOUNCE_SECONDS, poll_interval=POLL_INTERVAL):
+    """Convert new or renamed .webp files in the roots until interrupted.
+
+    Uses watchdog filesystem events when available and falls back to
+    rescanning every ``poll_interval`` seconds. A file is converted once its
+    size and mtime have been stable for ``debounce`` seconds, so partially
+    written downloads are left alone; a file that still fails to decode is
+    retried as soon as it changes again. At most two jobs per worker are in
+    flight at a time.
+    """
+    roots = [Path(root).resolve() for root in roots]
+    options = options or save_options(target)
+    workers = workers or os.cpu_count()
+    events = queue.SimpleQueue()
+    pending = {}  # path -> (size, mtime_ns, stable since)
+    in_flight = {}  # future -> (source path, (size, mtime_ns))
+    failed = {}  # source path -> (size, mtime_ns) it failed to convert at
+
+    observer = None
+    if Observer is not None:
+        observer = Observer()
+        for root in roots:
+            observer.schedule(WebpEventHandler(events), str(root), recursive=recursive)
+        observer.start()
+        print(f"Watching {', '.join(map(str, roots))} for .webp files (filesystem events)...")
+    else:
+        known = snapshot(roots, recursive)
+        next_poll = time.monotonic() + poll_interval
+        print(f"Watching {', '.join(map(str, roots))} for .webp files (polling every {poll_interval}s)...")
+
+    def root_for(path):
+        return next((root for root in roots if path.is_relative_to(root)), None)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while True:
+                # Collect changed paths; wait longer while idle so an empty folder costs no CPU
+                idle = not pending and not in_flight
+                if observer is not None:
+                    try:
+                        event_path = events.get(timeout=1.0 if idle else TICK)
+                        while True:
+                            path = Path(event_path).resolve()
+                            # A symlink can resolve outside every root; skip those
+                            if is_webp_source(path) and root_for(path) is not None:
+                                pending[path] = None
+                            event_path = events.get_nowait()
+                    except queue.Empty:
+                        pass
+                else:
+                    time.sleep(max(0.0, next_poll - time.monotonic()) if idle else TICK)
+                    if time.monotonic() >= next_poll:
+                        current = snapshot(roots, recursive)
+                        for path, state in current.items():
+                            if known.get(path) != state:
+                                pending[path] = None
+                        known = current
+                        next_poll = time.monotonic() + poll_interval
+
+                # Report finished conversions
+                for future in [future for future in in_flight if future.done()]:
+                    webp_path, state = in_flight.pop(future)
+                    try:
+                        future.result()
+                    except Exception as error:  # e.g. Pillow's DecompressionBombError
+                        failed[webp_path] = state
+                        print(f"Failed to convert {webp_path}: {error} (will retry if it changes)")
+                    else:
+                        failed.pop(webp_path, None)
+                        print(f"Converted {webp_path.name} to {target.upper()} format.")
+
+                # Submit files whose size and mtime have settled
+                now = time.monotonic()
+                for path, seen in list(pending.items()):
+                    if len(in_flight) >= 2 * workers:
+                        break
+                    try:
+                        stat = path.stat()
+                    except FileNotFoundError:
+                        del pending[path]
+                        continue
+                    state = (stat.st_size, stat.st_mtime_ns)
+                    if seen is None or seen[:2] != state:
+                        pending[path] = (*state, now)
+                        continue
+                    if now - seen[2] < debounce:
+                        continue
+                    del pending[path]
+                    out_path = output_path(root_for(path), path, target, output_dir)
+                    if failed.get(path) != state and not is_up_to_date(path, out_path):
+                        job = (path, out_path, target, options)
+                        in_flight[executor.submit(convert_image, job)] = (path, state)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch convert .webp images to PNG (or lossless WebP/AVIF).")
+    parser.add_argument("inputs", nargs="*", default=[downloads_dir], help="Files or directories to convert.")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Search directories recursively.")
+    parser.add_argument("-o", "--output-dir", help="Write outputs here instead of next to the sources.")
+    parser.add_argument("--format", choices=FORMATS, default="png", help="Output format (default: png).")
+    parser.add_argument(
+        "--compress-level", type=int, default=6, choices=range(10), metavar="0-9",
+        help="PNG zlib level: 1 is fastest, 9 smallest (default: 6).",
+    )
+    parser.add_argument("--optimize", action="store_true", help="Spend extra CPU for smaller files.")
+    parser.add_argument("--quality", type=int, default=80, help="AVIF quality / WebP effort (default: 80).")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per core).")
+    parser.add_argument("--force", action="store_true", help="Reconvert even if the output is up to date.")
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="After converting existing files, keep converting new .webp files as they arrive.",
+    )
+    args = parser.parse_args(argv)
+
+    if args.format == "avif" and ".avif" not in Image.registered_extensions():
+        parser.error("this Pillow build has no AVIF support")
+
+    files = find_webp_files(args.inputs, args.recursive)
+    options = save_options(args.format, args.compress_level, args.optimize, args.quality)
+    convert_all(files, args.format, args.output_dir, options, args.workers, args.force)
+
+    if args.watch:
+        roots = [path for path in args.inputs if Path(path).is_dir()]
+        if not roots:
+            parser.error("--watch needs at least one directory")
+        watch(roots, args.format, args.output_dir, options, args.workers, args.recursive)
+
+
+if __name__ == "__main__":
+    main()
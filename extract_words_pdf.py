@@ -1,49 +1,297 @@
+import argparse
+import csv
 import os
+import re
+import sqlite3
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
 import PyPDF2
 
-def extract_text_from_pdf(pdf_path):
+PAGES_PER_JOB = 8  # Pages each worker extracts per task
+
+PARTS_OF_SPEECH = (
+    r'(?:n|v|adj|adv|prep|conj|pron|det|exclam|number|modal v|auxiliary v'
+    r'|indefinite article|definite article|infinitive marker)'
+)
+POS_REGEX = re.compile(rf'\b{PARTS_OF_SPEECH}\b')
+
+# Comma-separated parts of speech followed by a CEFR level, e.g. "n. B1",
+# "adj.B2", "modal v. A1", "prep., adv. A1"
+POS_LEVEL_REGEX = re.compile(
+    rf'\b({PARTS_OF_SPEECH}\.?(?:\s*,\s*{PARTS_OF_SPEECH}\.?)*)\s*([ABC][12])\b'
+)
+
+# Output file suffix per format
+OUTPUT_SUFFIXES = {'txt': '_cleaned.txt', 'csv': '_words.csv', 'tsv': '_words.tsv'}
+
+
+def count_pages(pdf_path):
+    with open(pdf_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def iter_page_texts(pdf_path, start=0, stop=None):
+    # Yield page texts one at a time instead of building the whole document
     with open(pdf_path, 'rb') as file:
         reader = PyPDF2.PdfReader(file)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text()
-        return text
+        stop = len(reader.pages) if stop is None else stop
+        for page_number in range(start, stop):
+            yield reader.pages[page_number].extract_text() or ''
 
-def format_text(text):
-    # Split the text into lines
-    lines = text.split('\n')
-    formatted_text = []
-    
+
+def extract_page_range(job):
+    # Runs in a worker process: each worker opens the PDF itself
+    pdf_path, start, stop = job
+    return pdf_path, list(iter_page_texts(pdf_path, start, stop))
+
+
+def extract_text_from_pdf(pdf_path):
+    return '\n'.join(iter_page_texts(pdf_path))
+
+
+def format_line(line):
+    # Remove any leading or trailing whitespace
+    line = line.strip()
+    if line:
+        # Split the line into words and levels (e.g., n.C1, adj.B2)
+        parts = line.split()
+        # Only take the first part (the word)
+        return parts[0]
+    return None
+
+
+def format_lines(lines):
     for line in lines:
-        # Remove any leading or trailing whitespace
-        line = line.strip()
-        if line:
-            # Split the line into words and levels (e.g., n.C1, adj.B2)
-            parts = line.split()
-            if len(parts) > 0:
-                # Only take the first part (the word)
-                word = parts[0]
-                formatted_text.append(word)
-    
-    return '\n'.join(formatted_text)
-
-def main():
-    # Define the input and output file paths
+        word = format_line(line)
+        if word is not None:
+            yield word
+
+
+def format_text(text):
+    return '\n'.join(format_lines(text.split('\n')))
+
+
+def parse_entries(line):
+    # Return (word, pos, level) for every part of speech on a word-list line,
+    # e.g. "about prep., adv. A1" gives one row per part of speech. A match
+    # right after another (only "," or spaces between) continues the same
+    # word; other text in between starts a new entry, as in
+    # "abandon v. B2 abstract adj. B2". Header/footer noise has no part of
+    # speech + level and yields nothing
+    entries = []
+    word = None
+    end = 0
+    for match in POS_LEVEL_REGEX.finditer(line):
+        between = line[end:match.start()].strip().strip(',').strip()
+        if between or word is None:
+            word = between
+            if not word:
+                return []
+        entries.extend((word, pos, match.group(2)) for pos in POS_REGEX.findall(match.group(1)))
+        end = match.end()
+    return entries
+
+
+class WordListWriter:
+    """
+    Writes one PDF's output file.
+
+    'txt' keeps the first word of every line, as before. 'csv' and 'tsv'
+    write deduplicated (word, pos, level) rows under a header row.
+    """
+
+    def __init__(self, path, output_format='txt'):
+        self.path = path
+        self.output_format = output_format
+        self.seen = set()
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.rows = None
+        if output_format != 'txt':
+            self.rows = csv.writer(self.file, delimiter='\t' if output_format == 'tsv' else ',')
+            self.rows.writerow(['word', 'pos', 'level'])
+
+    def write_lines(self, lines):
+        # Returns the new (word, pos, level) entries for the SQLite index
+        if self.rows is None:
+            for word in format_lines(lines):
+                self.file.write(word + '\n')
+            return []
+
+        new_entries = []
+        for line in lines:
+            for entry in parse_entries(line):
+                if entry not in self.seen:
+                    self.seen.add(entry)
+                    new_entries.append(entry)
+        self.rows.writerows(new_entries)
+        return new_entries
+
+    def close(self):
+        self.file.close()
+
+
+def open_word_db(db_path):
+    connection = sqlite3.connect(db_path)
+    connection.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS words (
+            word TEXT NOT NULL,
+            pos TEXT NOT NULL,
+            level TEXT NOT NULL,
+            source TEXT NOT NULL,
+            UNIQUE (word, pos, level, source)
+        );
+        CREATE INDEX IF NOT EXISTS words_word ON words (word);
+        CREATE INDEX IF NOT EXISTS words_level ON words (level);
+        """
+    )
+    return connection
+
+
+def ordered_map(executor, fn, jobs, window):
+    # Like executor.map, but only keeps `window` jobs in flight so memory stays bounded
+    jobs = iter(jobs)
+    pending = deque(executor.submit(fn, job) for job in islice(jobs, window))
+    while pending:
+        result = pending.popleft().result()
+        for job in islice(jobs, 1):
+            pending.append(executor.submit(fn, job))
+        yield result
+
+
+def page_jobs(pdf_paths, pages_per_job=PAGES_PER_JOB):
+    for pdf_path in pdf_paths:
+        page_count = count_pages(pdf_path)
+        for start in range(0, page_count, pages_per_job):
+            yield pdf_path, start, min(start + pages_per_job, page_count)
+
+
+def output_path_for(pdf_path, output_dir=None, output_format='txt'):
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    return os.path.join(output_dir or os.path.dirname(pdf_path), stem + OUTPUT_SUFFIXES[output_format])
+
+
+def extract_words(pdf_paths, output_dir=None, workers=None, output_format='txt', db_path=None):
+    """
+    Extracts each PDF's word list into '<name>_cleaned.txt' (or a CSV/TSV table).
+
+    Pages are extracted in parallel, in chunks of PAGES_PER_JOB, and written
+    in page order as they arrive, so memory use does not grow with PDF size.
+
+    :param pdf_paths: PDF files to process
+    :param output_dir: Folder for the output files (default: next to each PDF)
+    :param workers: Number of worker processes (default: one per CPU core)
+    :param output_format: 'txt' (first word per line), 'csv' or 'tsv' (word, pos, level)
+    :param db_path: Optional SQLite database that also receives the parsed entries
+    """
+    workers = workers or os.cpu_count()
+    writer = None
+    current_pdf = None
+    db = open_word_db(db_path) if db_path else None
+    entry_count = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        if workers > 1:
+            results = ordered_map(executor, extract_page_range, page_jobs(pdf_paths), 2 * workers)
+        else:
+            # A single worker gains nothing from a pool, so stream each PDF in-process
+            results = (
+                (pdf_path, [text]) for pdf_path in pdf_paths for text in iter_page_texts(pdf_path)
+            )
+        try:
+            for pdf_path, texts in results:
+                if pdf_path != current_pdf:
+                    if writer:
+                        writer.close()
+                        print(f"Output saved to '{writer.path}'.")
+                    current_pdf = pdf_path
+                    writer = WordListWriter(output_path_for(pdf_path, output_dir, output_format), output_format)
+                for text in texts:
+                    lines = text.split('\n')
+                    entries = writer.write_lines(lines)
+                    entry_count += len(entries)
+                    if db is not None:
+                        if output_format == 'txt':
+                            entries = [entry for line in lines for entry in parse_entries(line)]
+                        source = os.path.basename(pdf_path)
+                        db.executemany(
+                            'INSERT OR IGNORE INTO words VALUES (?, ?, ?, ?)',
+                            [(*entry, source) for entry in entries],
+                        )
+        finally:
+            if writer:
+                writer.close()
+                print(f"Output saved to '{writer.path}'.")
+            if db is not None:
+                db.commit()
+                db.close()
+
+    return entry_count
+
+
+def benchmark(pdf_paths, workers=None):
+    # Compare the original single-process text path with the structured pipeline
+    start = time.perf_counter()
+    line_count = 0
+    for pdf_path in pdf_paths:
+        line_count += format_text(extract_text_from_pdf(pdf_path)).count('\n') + 1
+    legacy_seconds = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        entry_count = extract_words(
+            pdf_paths, output_dir, workers, 'tsv', os.path.join(output_dir, 'words.db')
+        )
+        structured_seconds = time.perf_counter() - start
+
+    print(f"Text path:       {line_count} lines in {legacy_seconds:.2f}s "
+          f"({line_count / legacy_seconds:.0f} lines/s)")
+    print(f"Structured path: {entry_count} entries in {structured_seconds:.2f}s "
+          f"({entry_count / structured_seconds:.0f} entries/s)")
+
+
+def find_pdfs(inputs):
+    pdf_paths = []
+    for input_path in inputs:
+        if os.path.isdir(input_path):
+            pdf_paths.extend(
+                os.path.join(input_path, name) for name in sorted(os.listdir(input_path))
+                if name.lower().endswith('.pdf')
+            )
+        else:
+            pdf_paths.append(input_path)
+    return pdf_paths
+
+
+def main(argv=None):
+    # Define the default input file
     input_folder = r'c:\Users\toddk\Documents'
     input_pdf_path = os.path.join(input_folder, 'The_Oxford_5000.pdf')
-    output_txt_path = os.path.join(input_folder, 'The_Oxford_5000_cleaned.txt')
-    
-    # Extract text from the PDF
-    text = extract_text_from_pdf(input_pdf_path)
-    
-    # Format the text by removing levels (e.g., v.C1, n.B2)
-    formatted_text = format_text(text)
-    
-    # Save the formatted text to the output file
-    with open(output_txt_path, 'w') as output_file:
-        output_file.write(formatted_text)
-    
-    print(f"Text extraction and formatting complete. Output saved to '{output_txt_path}'.")
+
+    parser = argparse.ArgumentParser(description='Extract the word column from word-list PDFs.')
+    parser.add_argument('inputs', nargs='*', default=[input_pdf_path], help='PDF files or folders of PDFs.')
+    parser.add_argument('-o', '--output-dir', help='Folder for the output files (default: next to each PDF).')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per core).')
+    parser.add_argument(
+        '--format', choices=OUTPUT_SUFFIXES, default='txt',
+        help="'txt': first word per line; 'csv'/'tsv': deduplicated word, pos, level rows.",
+    )
+    parser.add_argument('--sqlite', help='Also store (word, pos, level) entries in this SQLite database.')
+    parser.add_argument('--benchmark', action='store_true', help='Time the text path against the structured path.')
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        benchmark(find_pdfs(args.inputs), args.workers)
+        return
+
+    # Extract and format the text, removing levels (e.g., v.C1, n.B2) unless a structured format is chosen
+    extract_words(find_pdfs(args.inputs), args.output_dir, args.workers, args.format, args.sqlite)
+
+    print("Text extraction and formatting complete.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,129 @@
+"""Front-matter reader for snippet and note files.
+
+Only the YAML subset the vault uses is understood: ``key: value`` scalars
+(plain or quoted), inline lists (``[a, b]``), block lists (``- a``) and
+folded (``>``) or literal (``|``) block scalars with ``-``/``+`` chomping.
+Obsidian wiki links such as ``[[note]]`` stay plain strings.
+
+``read_front_matter`` reads a bounded prefix of the file and only reads
+further while the closing ``---`` has not been seen, so large snippet
+bodies are not loaded just to look at their header.
+"""
+import re
+from typing import NamedTuple
+
+PREFIX_SIZE = 4096  # Bytes read before looking for the closing '---'
+
+OPENING_REGEX = re.compile(rb"---[ \t]*\r?\n")
+FRONT_MATTER_REGEX = re.compile(rb"---[ \t]*\r?\n(.*?)^---[ \t]*(?:\r?\n|\Z)", re.DOTALL | re.MULTILINE)
+# A top-level "key:" line (keys never start with whitespace, '-' or '#')
+KEY_REGEX = re.compile(r"([^\s#\-][^:]*):(?:[ \t]+(.*)|[ \t]*)$")
+
+
+class FrontMatter(NamedTuple):
+    """Parsed header plus the bytes it was read from."""
+    data: dict
+    text: str  # YAML between the '---' lines
+    raw: bytes  # The whole header, '---' lines included ('' if there is none)
+    head: bytes  # Everything read from the file, starting at offset 0
+
+
+def _unquote(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == "'":
+        return value[1:-1].replace("''", "'")
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"')
+    return value
+
+
+def _inline_list(value):
+    return [_unquote(item) for item in value[1:-1].split(",") if item.strip()]
+
+
+def _block_scalar(indicator, lines):
+    """Decode a ``|`` (literal) or ``>`` (folded) block scalar."""
+    indent = min((len(line) - len(line.lstrip()) for line in lines if line.strip()), default=0)
+    lines = [line[indent:] for line in lines]
+    trailing = 0
+    while lines and not lines[-1].strip():
+        lines.pop()
+        trailing += 1
+
+    if indicator.startswith("|"):
+        text = "\n".join(lines)
+    else:
+        # Folding: single line breaks become spaces, blank lines become line breaks
+        paragraphs = []
+        current = []
+        for line in lines:
+            if line.strip():
+                current.append(line.strip())
+            else:
+                paragraphs.append(" ".join(current))
+                current = []
+        paragraphs.append(" ".join(current))
+        text = "\n".join(paragraphs)
+
+    if "-" in indicator:
+        return text
+    if "+" in indicator:
+        return text + "\n" * (trailing + 1)
+    return text + "\n" if text else text
+
+
+def parse_value(value, lines):
+    """Decode one entry from the text after its ``key:`` and its continuation lines."""
+    value = (value or "").strip()
+    if value and value[0] in "|>":
+        return _block_scalar(value, lines)
+    if value.startswith("[") and not value.startswith("[[") and value.endswith("]"):
+        return _inline_list(value)
+    if not value:
+        items = [line.strip() for line in lines if line.strip()]
+        if items and all(item.startswith("-") for item in items):
+            return [_unquote(item[1:]) for item in items]
+        return " ".join(items) or None
+    # Plain scalars may continue on indented lines
+    return _unquote(" ".join([value] + [line.strip() for line in lines if line.strip()]))
+
+
+def split_entries(text):
+    """Return ``[(key, value, continuation_lines, raw_lines)]`` for each top-level key."""
+    entries = []
+    for line in text.splitlines():
+        match = KEY_REGEX.match(line)
+        if match:
+            entries.append((match.group(1).strip(), match.group(2), [], [line]))
+        elif entries:
+            entries[-1][2].append(line)
+            entries[-1][3].append(line)
+    return entries
+
+
+def parse_front_matter(text):
+    """Parse front-matter YAML text into a dict."""
+    return {key: parse_value(value, lines) for key, value, lines, _ in split_entries(text)}
+
+
+def read_front_matter(path, prefix_size=PREFIX_SIZE):
+    """Read just enough of ``path`` to parse its front matter.
+
+    The prefix is doubled until the closing ``---`` is inside it, so a
+    file is only read to the end if its header never closes.
+    """
+    with open(path, "rb") as file:
+        head = file.read(prefix_size)
+        at_eof = len(head) < prefix_size
+        while OPENING_REGEX.match(head):
+            match = FRONT_MATTER_REGEX.match(head)
+            if match and (at_eof or match.end() < len(head)):
+                text = match.group(1).decode("utf-8")
+                return FrontMatter(parse_front_matter(text), text, match.group(0), head)
+            if at_eof:
+                break
+            requested = len(head)
+            chunk = file.read(requested)
+            at_eof = len(chunk) < requested
+            head += chunk
+    return FrontMatter({}, "", b"", head)
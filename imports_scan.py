@@ -1,40 +1,435 @@
+import argparse
+import ast
+import json
 import os
 import re
+import subprocess
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
-def scan_directory_for_imports(root_dir, output_file):
-    """
-    Scans the given directory and its subdirectories for Python files,
-    extracts import statements, and writes them to an output file.
+CACHE_FILENAME = ".imports_scan_cache.json"
+CACHE_VERSION = 1
 
-    :param root_dir: The root directory to start scanning
-    :param output_file: The path to the output file where imports will be saved
+STDLIB_MODULES = set(sys.stdlib_module_names)
+
+# One line of `python -X importtime` output: self us | cumulative us | indented module name
+IMPORTTIME_REGEX = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+# DOT fill colour per module kind
+KIND_COLORS = {'stdlib': 'lightgrey', 'third-party': 'lightsalmon', 'local': 'lightblue'}
+
+
+def find_python_files(root_dir):
     """
-    imports = set()  # Use a set to avoid duplicate imports
+    Walks root_dir for Python files, skipping anything starting with ".".
 
+    :return: Sorted list of paths relative to root_dir
+    """
+    found = []
     for root, dirs, files in os.walk(root_dir):
         # Filter out directories and files starting with "."
         dirs[:] = [d for d in dirs if not d.startswith('.')]
-        files = [f for f in files if not f.startswith('.') and f.endswith('.py')]
-
         for file in files:
-            full_path = os.path.join(root, file)
-            with open(full_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    # Match import and from-import statements
-                    match = re.match(r'^\s*(import\s+\w+|from\s+\w+\s+import\s+.+)', line)
-                    if match:
-                        imports.add(match.group(0).strip())
-
-    # Write the collected imports to the output file
+            if not file.startswith('.') and file.endswith('.py'):
+                found.append(os.path.relpath(os.path.join(root, file), root_dir))
+    return sorted(found)
+
+
+def parse_imports(path):
+    """
+    Parses a Python file and returns its imports as [module, level] pairs.
+
+    ``module`` is the full dotted name ("os.path", or "" for "from . import x")
+    and ``level`` is the number of leading dots of a relative import.
+    Handles multi-line, comma-separated and nested imports.
+    """
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend([alias.name, 0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.append([node.module or '', node.level])
+    return imports
+
+
+def _parse_job(path):
+    try:
+        return path, parse_imports(path), None
+    except (SyntaxError, ValueError, OSError) as error:
+        return path, [], str(error)
+
+
+def top_level(module):
+    return module.split('.', 1)[0]
+
+
+def local_module_names(files):
+    """
+    Top-level names importable from the scan root (modules and package folders).
+
+    Nested files are not included: they are only local to their siblings,
+    which ``resolve_local`` checks per importer.
+    """
+    names = set()
+    for rel_path in files:
+        parts = rel_path.split(os.sep)
+        names.add(parts[0][:-3] if len(parts) == 1 else parts[0])
+    return names
+
+
+def classify(module, level, local_names):
+    if level or top_level(module) in local_names:
+        return 'local'
+    if top_level(module) in STDLIB_MODULES:
+        return 'stdlib'
+    return 'third-party'
+
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data.get('files', {}) if data.get('version') == CACHE_VERSION else {}
+
+
+def save_cache(cache_path, entries):
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': CACHE_VERSION, 'files': entries}, f)
+    os.replace(tmp_path, cache_path)
+
+
+def collect_imports(root_dir, workers=None, cache_path=None):
+    """
+    Parses every Python file under root_dir with ``ast`` and returns
+    {relative path: [[module, level], ...]}.
+
+    Files whose mtime and size match the cache are not reparsed; the rest
+    are parsed across a process pool.
+    """
+    files = find_python_files(root_dir)
+    cache = load_cache(cache_path) if cache_path else {}
+    results = {}
+    stale = []
+
+    for rel_path in files:
+        stat = os.stat(os.path.join(root_dir, rel_path))
+        entry = cache.get(rel_path)
+        if entry and entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            results[rel_path] = entry['imports']
+        else:
+            stale.append(rel_path)
+
+    full_paths = [os.path.join(root_dir, rel_path) for rel_path in stale]
+    if len(full_paths) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed = list(executor.map(_parse_job, full_paths, chunksize=32))
+    else:
+        parsed = [_parse_job(path) for path in full_paths]
+
+    for rel_path, (path, imports, error) in zip(stale, parsed):
+        results[rel_path] = imports
+        if error:
+            # Not cached, so the warning comes back until the file is fixed
+            print(f"Skipping {path}: {error}")
+            cache.pop(rel_path, None)
+            continue
+        stat = os.stat(path)
+        cache[rel_path] = {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'imports': imports}
+
+    if cache_path and stale:
+        save_cache(cache_path, {rel_path: cache[rel_path] for rel_path in files if rel_path in cache})
+
+    print(f"Parsed {len(stale)} changed files, reused {len(files) - len(stale)} cached results.")
+    return results
+
+
+def aggregate_imports(file_imports):
+    """
+    Normalizes imports to top-level module names and aggregates them.
+
+    :return: (modules, per_file) where modules maps a module to its kind,
+             import count and importing files, and per_file maps a file to a
+             Counter of the top-level modules it imports
+    """
+    local_names = local_module_names(file_imports)
+    local_modules = {module_name_for(rel_path) for rel_path in file_imports}
+    modules = {}
+    per_file = {}
+
+    for rel_path, imports in file_imports.items():
+        importer = module_name_for(rel_path)
+        counts = Counter()
+        for module, level in imports:
+            name = '.' * level + top_level(module) if level else top_level(module)
+            kind = classify(module, level, local_names)
+            if kind != 'local':
+                # A bare sibling import is only local for files in that folder,
+                # so it is listed under the module it resolves to
+                target = resolve_local(importer, rel_path, module, level, local_modules)
+                if target is not None:
+                    name, kind = target, 'local'
+            counts[name] += 1
+            info = modules.setdefault(name, {'kind': kind, 'count': 0, 'files': set()})
+            info['count'] += 1
+            info['files'].add(rel_path)
+        per_file[rel_path] = counts
+
+    return modules, per_file
+
+
+def module_name_for(rel_path):
+    """'pkg/sub.py' -> 'pkg.sub', 'pkg/__init__.py' -> 'pkg'."""
+    parts = os.path.splitext(rel_path)[0].split(os.sep)
+    if parts[-1] == '__init__' and len(parts) > 1:
+        parts.pop()
+    return '.'.join(parts)
+
+
+def resolve_local(importer, rel_path, module, level, local_modules):
+    """
+    Returns the local module an import refers to, or None if it is not local.
+
+    Relative imports are resolved against the importer's package; absolute
+    imports are tried both from the scan root and from the importer's folder
+    (scripts import their siblings by bare name). The longest matching
+    module prefix wins, so 'pkg.sub.func' resolves to 'pkg.sub'.
+    """
+    package = importer.split('.')
+    if not rel_path.endswith('__init__.py'):
+        package.pop()
+
+    # (candidate, shortest prefix allowed): a sibling candidate must not
+    # shrink to the importer's own package, or every import would match it
+    if level:
+        base = package[:len(package) - level + 1] if level <= len(package) + 1 else []
+        candidates = [('.'.join(base + ([module] if module else [])), 0)]
+    else:
+        candidates = [(module, 0)]
+        if package:
+            candidates.append(('.'.join(package + [module]), len(package)))
+
+    for candidate, shortest in candidates:
+        parts = candidate.split('.')
+        for end in range(len(parts), shortest, -1):
+            name = '.'.join(parts[:end])
+            if name in local_modules:
+                return name
+    return '.' * level + module if level else None
+
+
+def build_dependency_graph(file_imports):
+    """
+    Turns collected imports into a module dependency graph.
+
+    Local files become nodes named by their dotted module path; stdlib and
+    third-party imports become one node per top-level package.
+
+    :return: {'nodes': {module: {'kind', 'file'}}, 'edges': {module: [imported modules]}}
+    """
+    local_names = local_module_names(file_imports)
+    local_modules = {module_name_for(rel_path): rel_path for rel_path in file_imports}
+    nodes = {module: {'kind': 'local', 'file': rel_path} for module, rel_path in local_modules.items()}
+    edges = {}
+
+    for rel_path, imports in file_imports.items():
+        importer = module_name_for(rel_path)
+        targets = set()
+        for module, level in imports:
+            target = resolve_local(importer, rel_path, module, level, local_modules)
+            if target is None:
+                target = top_level(module)
+                nodes.setdefault(target, {'kind': classify(module, level, local_names), 'file': None})
+            else:
+                nodes.setdefault(target, {'kind': 'local', 'file': None})
+            if target != importer:
+                targets.add(target)
+        edges[importer] = sorted(targets)
+
+    return {'nodes': nodes, 'edges': edges}
+
+
+def parse_importtime(output):
+    """Parses `python -X importtime` stderr into {module: (self_us, cumulative_us)}."""
+    timings = {}
+    for line in output.splitlines():
+        match = IMPORTTIME_REGEX.match(line)
+        if match:
+            timings[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return timings
+
+
+def profile_import(entry_point, root_dir):
+    """
+    Imports entry_point (a module name or a .py path) in a fresh interpreter
+    under `python -X importtime` and returns its timings.
+
+    Only the import is timed: the `if __name__ == "__main__"` block does not run.
+    """
+    if entry_point.endswith('.py'):
+        entry_dir, entry_file = os.path.split(os.path.abspath(entry_point))
+        module = os.path.splitext(entry_file)[0]
+    else:
+        entry_dir, module = os.path.abspath(root_dir), entry_point
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         f'import importlib; importlib.import_module({module!r})'],
+        cwd=entry_dir, capture_output=True, text=True,
+    )
+    if result.returncode:
+        print(f"Importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    return parse_importtime(result.stderr)
+
+
+def add_import_times(graph, timings):
+    """
+    Joins importtime timings onto graph nodes as 'self_us' and 'cumulative_us'.
+
+    Local modules get their own self time. External nodes stand for a whole
+    package, so they get its cumulative time (submodules included).
+    """
+    for module, node in graph['nodes'].items():
+        if module not in timings:
+            continue
+        self_us, cumulative_us = timings[module]
+        node['self_us'] = self_us if node['kind'] == 'local' else cumulative_us
+        node['cumulative_us'] = cumulative_us
+
+
+def heaviest_chains(graph, top=10):
+    """
+    Returns the `top` most expensive import chains starting at a local module
+    as [(cost, [module, ...])], most expensive first.
+
+    A chain's cost is the sum of its modules' 'self_us' when import timings
+    are joined on, otherwise its length. Cycles are cut at the first repeated module.
+    """
+    nodes, edges = graph['nodes'], graph['edges']
+    timed = any('self_us' in node for node in nodes.values())
+    best = {}
+
+    def cost_of(module):
+        return nodes[module].get('self_us', 0) if timed else 1
+
+    def heaviest_from(module, on_path):
+        if module in best:
+            return best[module]
+        on_path.add(module)
+        chain_cost, chain = 0, []
+        for target in edges.get(module, ()):
+            if target not in on_path:
+                cost, path = heaviest_from(target, on_path)
+                if cost > chain_cost:
+                    chain_cost, chain = cost, path
+        on_path.discard(module)
+        best[module] = (cost_of(module) + chain_cost, [module] + chain)
+        return best[module]
+
+    chains = [heaviest_from(module, set()) for module in sorted(edges)]
+    chains.sort(key=lambda item: (-item[0], item[1]))
+    return chains[:top]
+
+
+def write_graph_json(graph, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(graph, f, indent=2, sort_keys=True)
+
+
+def write_graph_dot(graph, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('digraph imports {\n    rankdir=LR;\n    node [shape=box, style=filled];\n')
+        for module, node in sorted(graph['nodes'].items()):
+            label = module
+            if 'self_us' in node:
+                label += f"\\n{node['self_us'] / 1000:.1f} ms"
+            f.write(f'    "{module}" [label="{label}", fillcolor={KIND_COLORS[node["kind"]]}];\n')
+        for module, targets in sorted(graph['edges'].items()):
+            for target in targets:
+                f.write(f'    "{module}" -> "{target}";\n')
+        f.write('}\n')
+
+
+def write_summary(modules, per_file, output_file):
+    """Writes the per-module summary, grouped by kind, followed by the per-file counts."""
     with open(output_file, 'w', encoding='utf-8') as f:
-        for imp in sorted(imports):  # Sort imports alphabetically for readability
-            f.write(f"{imp}\n")
+        for kind in ('stdlib', 'third-party', 'local'):
+            names = sorted(name for name, info in modules.items() if info['kind'] == kind)
+            f.write(f"# {kind} ({len(names)} modules)\n")
+            for name in names:
+                info = modules[name]
+                f.write(f"{name}\t{info['count']} imports\t{len(info['files'])} files\n")
+            f.write("\n")
+
+        f.write("# per file\n")
+        for rel_path in sorted(per_file):
+            modules_in_file = ", ".join(f"{name} ({count})" for name, count in sorted(per_file[rel_path].items()))
+            f.write(f"{rel_path}: {modules_in_file}\n")
 
     print(f"Imports written to {output_file}")
 
 
-if __name__ == "__main__":
+def scan_directory_for_imports(root_dir, output_file, workers=None, use_cache=True):
+    """
+    Scans the given directory and its subdirectories for Python files,
+    extracts imports with ``ast``, and writes a per-module summary to an output file.
+
+    :param root_dir: The root directory to start scanning
+    :param output_file: The path to the output file where imports will be saved
+    :param workers: Number of worker processes (default: one per CPU core)
+    :param use_cache: Reuse results for files whose mtime and size are unchanged
+    :return: {relative path: [[module, level], ...]} as returned by collect_imports
+    """
+    cache_path = os.path.join(root_dir, CACHE_FILENAME) if use_cache else None
+    file_imports = collect_imports(root_dir, workers, cache_path)
+    write_summary(*aggregate_imports(file_imports), output_file)
+    return file_imports
+
+
+def main(argv=None):
     root_directory = r"C:\Users\toddk\Documents\MyCode"
     output_file_path = r"C:\Users\toddk\Documents\MyCode\import_list.txt"
-    
-    scan_directory_for_imports(root_directory, output_file_path)
+
+    parser = argparse.ArgumentParser(description="Summarize the imports of every Python file in a tree.")
+    parser.add_argument("root", nargs="?", default=root_directory, help="Directory to scan.")
+    parser.add_argument("-o", "--output", default=output_file_path, help="Summary file to write.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per core).")
+    parser.add_argument("--no-cache", action="store_true", help="Reparse every file.")
+    parser.add_argument(
+        "--graph", metavar="PREFIX",
+        help="Also write the module dependency graph to PREFIX.json and PREFIX.dot.",
+    )
+    parser.add_argument(
+        "--importtime", metavar="ENTRY",
+        help="Time importing ENTRY (module name or .py file) with -X importtime and join it onto the graph.",
+    )
+    parser.add_argument("--top", type=int, default=10, help="Number of heaviest import chains to report.")
+    args = parser.parse_args(argv)
+
+    file_imports = scan_directory_for_imports(args.root, args.output, args.workers, not args.no_cache)
+    if not args.graph and not args.importtime:
+        return
+
+    graph = build_dependency_graph(file_imports)
+    if args.importtime:
+        add_import_times(graph, profile_import(args.importtime, args.root))
+
+    unit = "ms" if args.importtime else "modules"
+    print(f"Heaviest import chains ({unit}):")
+    for cost, chain in heaviest_chains(graph, args.top):
+        cost_text = f"{cost / 1000:.1f}" if args.importtime else str(cost)
+        print(f"  {cost_text:>8}  {' -> '.join(chain)}")
+
+    if args.graph:
+        write_graph_json(graph, args.graph + ".json")
+        write_graph_dot(graph, args.graph + ".dot")
+        print(f"Dependency graph written to {args.graph}.json and {args.graph}.dot")
+
+
+if __name__ == "__main__":
+    main()
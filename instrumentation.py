@@ -0,0 +1,190 @@
+"""Logging, phase timers, counters, progress and profiling for the snippet scripts.
+
+A script adds the shared options with ``add_instrumentation_arguments`` and
+runs its work inside ``instrumented(args)``, which configures logging,
+starts the profiler for ``--profile`` and finally logs how long each phase
+took and what was counted:
+
+    with phase("compare"):
+        for snippet in progress(snippets, "Comparing"):
+            ...
+    count("comparisons", checked)
+
+Phases and counters live in the module-level ``metrics`` of the main
+process; work done in worker processes is counted by the caller. Nothing
+here costs anything when it is not asked for: ``progress`` returns the
+iterable itself unless stderr is a terminal and INFO messages are shown,
+log messages are only formatted when their level is enabled, and a phase
+costs two ``perf_counter`` calls.
+"""
+import cProfile
+import io
+import json
+import logging
+import pstats
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+PROGRESS_INTERVAL = 0.5  # Seconds between progress bar updates
+PROFILE_LINES = 25  # Functions listed after a --profile run
+
+log = logging.getLogger("snippets")
+
+# Standard LogRecord attributes; anything else on a record came from ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class TextFormatter(logging.Formatter):
+    """Plain messages for INFO, prefixed with the level otherwise."""
+
+    def format(self, record):
+        message = super().format(record)
+        if record.levelno == logging.INFO:
+            return message
+        return f"{record.levelname.lower()}: {message}"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including any ``extra`` fields."""
+
+    def format(self, record):
+        entry = {
+            "time": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class Metrics:
+    """Accumulated seconds per phase and named counters."""
+
+    def __init__(self):
+        self.phases = {}
+        self.counters = Counter()
+
+    @contextmanager
+    def phase(self, name):
+        """Add the time spent in the ``with`` block to phase ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def report(self):
+        """Log the phase timings and counters, if anything was recorded."""
+        if not self.phases and not self.counters:
+            return
+        timings = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items())
+        counters = ", ".join(f"{name}={value}" for name, value in sorted(self.counters.items()))
+        log.info(
+            "Phases: %s; counters: %s", timings or "none", counters or "none",
+            extra={"phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+                   "counters": dict(self.counters)},
+        )
+
+
+metrics = Metrics()
+phase = metrics.phase
+count = metrics.count
+
+_progress_enabled = False
+
+
+def configure_logging(verbosity=0, log_format="text", show_progress=True):
+    """Send log records to stderr: WARNING with ``verbosity`` < 0, INFO at 0, DEBUG above."""
+    global _progress_enabled
+    level = logging.DEBUG if verbosity > 0 else logging.INFO if verbosity == 0 else logging.WARNING
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+    _progress_enabled = (
+        show_progress and log_format == "text" and level <= logging.INFO and sys.stderr.isatty()
+    )
+
+
+def _format_seconds(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def _progress(iterable, description, total, interval):
+    start = last = time.perf_counter()
+    done = 0
+    for done, item in enumerate(iterable, 1):
+        yield item
+        now = time.perf_counter()
+        if now - last >= interval:
+            last = now
+            rate = done / (now - start)
+            line = f"{description}: {done}/{total}" if total else f"{description}: {done}"
+            if total:
+                line += f" ({done / total:.0%}) ETA {_format_seconds((total - done) / rate)}"
+            sys.stderr.write(f"\r{line} [{rate:.0f}/s]\033[K")
+            sys.stderr.flush()
+    if last != start:
+        sys.stderr.write(f"\r{description}: {done} done in {_format_seconds(time.perf_counter() - start)}\033[K\n")
+        sys.stderr.flush()
+
+
+def progress(iterable, description, total=None, interval=PROGRESS_INTERVAL):
+    """Yield from ``iterable`` while drawing a rate-limited progress bar with ETA on stderr.
+
+    ``total`` defaults to ``len(iterable)``. When progress is disabled the
+    iterable is returned as it is.
+    """
+    if not _progress_enabled:
+        return iterable
+    if total is None:
+        total = len(iterable) if hasattr(iterable, "__len__") else None
+    return _progress(iterable, description, total, interval)
+
+
+def add_instrumentation_arguments(parser):
+    """Add the logging, progress and profiling options to a script's argument parser."""
+    group = parser.add_argument_group("output and profiling")
+    group.add_argument("-v", "--verbose", action="count", default=0, help="Log per-file details.")
+    group.add_argument("-q", "--quiet", action="count", default=0, help="Only log warnings and errors.")
+    group.add_argument(
+        "--log-format", choices=("text", "json"), default="text",
+        help="Log as plain text or as one JSON object per line (default: text).",
+    )
+    group.add_argument("--no-progress", action="store_true", help="Do not draw progress bars.")
+    group.add_argument(
+        "--profile", nargs="?", const=f"{Path(sys.argv[0]).stem}.prof", metavar="FILE",
+        help="Run under cProfile and save the stats to FILE (default: <script>.prof).",
+    )
+
+
+@contextmanager
+def instrumented(args):
+    """Configure logging from ``args``, profile if asked, and log the metrics at the end."""
+    configure_logging(args.verbose - args.quiet, args.log_format, not args.no_progress)
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    try:
+        yield metrics
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            if log.isEnabledFor(logging.INFO):
+                top = io.StringIO()
+                pstats.Stats(profiler, stream=top).sort_stats("cumulative").print_stats(PROFILE_LINES)
+                log.info("Profile saved at %s\n%s", args.profile, top.getvalue().strip())
+        metrics.report()
@@ -0,0 +1,111 @@
+import argparse
+import logging
+import re
+from pathlib import Path
+
+from instrumentation import add_instrumentation_arguments, instrumented, phase
+from snippet_corpus import parse_snippet, snippet_filename
+from snippet_links import rewrite_snippet_links
+from vault_config import add_vault_arguments, vault_paths
+from vault_manifest import MANIFEST_FILENAME, VaultManifest, find_notes
+from vault_plan import VaultPlan, read_text
+
+# Paths (see vault_config for the --vault/--snippets options and environment variables)
+NOTES_PATH, SNIPPETS_PATH = vault_paths()
+
+# Regex to match legacy filenames named after Python's per-process hash(): language_<int>.md
+FILENAME_PATTERN = re.compile(r"^(\w+)_[-\d]+\.md$")
+
+log = logging.getLogger("migrate_snippet_names")
+
+
+def plan_renames(snippet_files, plan):
+    """Plan moving each legacy snippet file to its content-addressed name.
+
+    The new file is written before the legacy one is deleted; a legacy copy
+    of code that already has a stable name is only deleted. Returns
+    ``{old_name: new_name}``.
+    """
+    renames = {}
+    for snippet_path in snippet_files:
+        match = FILENAME_PATTERN.match(snippet_path.name)
+        if not match:
+            continue
+        content = read_text(snippet_path)
+        new_name = snippet_filename(match.group(1), parse_snippet(snippet_path, content).code)
+        if new_name == snippet_path.name:
+            continue
+
+        new_path = snippet_path.with_name(new_name)
+        if new_path.exists() or plan.pending(new_path) is not None:
+            log.debug("Removing duplicate snippet: %s (same code as %s)", snippet_path.name, new_name)
+        else:
+            log.debug("Renaming snippet: %s -> %s", snippet_path.name, new_name)
+            plan.write(new_path, content)
+        plan.delete(snippet_path)
+        renames[snippet_path.name] = new_name
+    return renames
+
+
+def rewrite_embeds(renames, plan, manifest):
+    """Plan rewriting embed links to renamed snippets.
+
+    Only the notes the embed index lists as embedding a renamed snippet are
+    read; the index must be up to date.
+    """
+    note_paths = sorted({note for old_name in renames for note in manifest.notes_embedding(old_name)})
+    for note_path in map(Path, note_paths):
+        content = read_text(note_path)
+        updated_content, replaced = rewrite_snippet_links(content, renames)
+        if replaced:
+            plan.write(note_path, updated_content, original=content)
+            log.debug("Updated embeds in note: %s (%d links)", note_path, replaced)
+
+
+def main(argv=None):
+    global NOTES_PATH, SNIPPETS_PATH
+    parser = argparse.ArgumentParser(description="Rename legacy snippet files to content-addressed names.")
+    parser.add_argument(
+        "--apply", action="store_true",
+        help="Rename the snippets and rewrite the notes (default: only print the plan).",
+    )
+    add_vault_arguments(parser)
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args(argv)
+    NOTES_PATH, SNIPPETS_PATH = vault_paths(args.vault, args.snippets, parser)
+
+    with instrumented(args):
+        # Ensure the Snippets folder exists
+        if not SNIPPETS_PATH.exists():
+            log.error("The directory %s does not exist.", SNIPPETS_PATH)
+            return
+
+        plan = VaultPlan(NOTES_PATH)
+        with phase("parse"):
+            renames = plan_renames(sorted(SNIPPETS_PATH.glob("*.md")), plan)
+        if not renames:
+            log.info("No legacy snippet filenames found.")
+            return
+
+        log.info("Migrating %d legacy snippet filenames...", len(renames))
+        with VaultManifest(NOTES_PATH / MANIFEST_FILENAME) as manifest:
+            # The embed index lists the notes to rewrite
+            with phase("scan"):
+                manifest.update_embeds(find_notes(NOTES_PATH, SNIPPETS_PATH))
+            rewrite_embeds(renames, plan, manifest)
+
+            plan.summary()
+            if not args.apply:
+                log.info("Dry run: nothing was changed. Run again with --apply to make these changes.")
+                return
+            plan.apply()
+
+            # Keep the embed index in step with the rewritten notes
+            for note_path, content in plan.writes.items():
+                if note_path.parent != SNIPPETS_PATH:
+                    manifest.refresh_embeds(note_path, content)
+        log.info("Finished migrating snippet filenames.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Single-pass tokenizer for fenced code blocks in notes.
+
+Notes are split into lines once. Fences follow the Markdown rules: three or
+more backticks or tildes open a block, and only a run of the same character
+at least as long closes it, so ```` fences can wrap ``` examples and ``~~~``
+blocks are recognized. The language is the first word of the info string
+(``c++``, ``objective-c`` and ``diff-js`` included) if it is a safe file
+name part; anything with a path separator or ``..`` counts as no language.
+Snippet filenames spell ``#`` as ``sharp`` (``csharp_<digest>.md``), since
+Obsidian would read it as a heading link.
+Unclosed blocks are left alone.
+
+Edits are made with ``splice``, which builds the new note in one join
+instead of one ``str.replace`` per block.
+"""
+import re
+from typing import NamedTuple
+
+# Opening fence: indentation, ``` or ~~~ (or longer), optional info string
+FENCE_REGEX = re.compile(r"([ \t]*)(`{3,}|~{3,})(.*)")
+# Fence languages kept on code blocks: no path separators, no leading '.'
+LANGUAGE_REGEX = re.compile(r"[\w+#][\w+#.-]*")
+# The same without '#', which Obsidian reads as a heading link in ![[...]] targets
+FILENAME_LANGUAGE_REGEX = re.compile(r"[\w+][\w+.-]*")
+
+
+class CodeBlock(NamedTuple):
+    """A fenced code block; ``start``/``end`` span its fences in the note."""
+    start: int
+    end: int
+    line: int
+    language: str
+    code: str
+
+
+def clean_language(language):
+    """Return ``language`` if it is safe to put in a filename, otherwise ''."""
+    if LANGUAGE_REGEX.fullmatch(language) and ".." not in language:
+        return language
+    return ""
+
+
+def filename_language(language):
+    """Return the form of ``language`` used in snippet filenames ('c#' -> 'csharp'), or ''."""
+    return clean_language(language).replace("#", "sharp")
+
+
+def split_lines(content):
+    """Return the note's lines (with line endings) and the offset each one starts at."""
+    lines = content.splitlines(keepends=True)
+    offsets = []
+    offset = 0
+    for line in lines:
+        offsets.append(offset)
+        offset += len(line)
+    return lines, offsets
+
+
+def iter_code_blocks(content, lines=None, offsets=None):
+    """Yield every closed fenced code block in the note, in order.
+
+    ``start`` is the first fence character (indentation before it is kept)
+    and ``end`` is the end of the closing fence line, before its newline.
+    """
+    if lines is None:
+        lines, offsets = split_lines(content)
+
+    index = 0
+    while index < len(lines):
+        match = FENCE_REGEX.fullmatch(lines[index].rstrip("\r\n"))
+        index += 1
+        if not match:
+            continue
+        indent, fence, info = match.groups()
+        if fence[0] == "`" and "`" in info:
+            # Inline code such as ```x``` is not a fence
+            continue
+
+        for close in range(index, len(lines)):
+            stripped = lines[close].strip()
+            if stripped and stripped.strip(fence[0]) == "" and len(stripped) >= len(fence):
+                body = [
+                    line[len(indent):] if line.startswith(indent) else line.lstrip(" \t")
+                    for line in lines[index:close]
+                ]
+                closing = lines[close].rstrip("\r\n")
+                yield CodeBlock(
+                    start=offsets[index - 1] + len(indent),
+                    end=offsets[close] + len(closing),
+                    line=index - 1,
+                    language=clean_language(info.split()[0]) if info.strip() else "",
+                    code="".join(body),
+                )
+                index = close + 1
+                break
+
+
+def block_context(lines, block, count=3):
+    """Return the non-empty lines among the ``count`` lines before a block, stripped."""
+    return [line.strip() for line in lines[max(block.line - count, 0):block.line] if line.strip()]
+
+
+def fence_for(code):
+    """Return a backtick fence longer than any backtick run inside ``code``."""
+    longest = max((len(run) for run in re.findall(r"`+", code)), default=0)
+    return "`" * max(3, longest + 1)
+
+
+def splice(content, blocks, replacements):
+    """Replace each block's span with the matching replacement in a single pass."""
+    parts = []
+    position = 0
+    for block, replacement in zip(blocks, replacements):
+        parts.append(content[position:block.start])
+        parts.append(replacement)
+        position = block.end
+    parts.append(content[position:])
+    return "".join(parts)
@@ -1,46 +1,52 @@
+import argparse
+import logging
 import os
-import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-# Path to your Obsidian vault
-VAULT_PATH = r"C:\Users\toddk\Documents\MyBrain"
-IGNORE_FOLDERS = {"Attachments", "Templates", "Prompting", "Journal"}
-OUTPUT_FOLDER = Path(VAULT_PATH) / "Snippets"
+from instrumentation import add_instrumentation_arguments, count, instrumented, phase, progress
+from note_blocks import block_context, fence_for, iter_code_blocks, splice, split_lines
+from snippet_corpus import snippet_filename
+from vault_config import add_vault_arguments, vault_paths
+from vault_manifest import MANIFEST_FILENAME, VaultManifest
+from vault_manifest import find_notes as find_vault_notes
+from vault_plan import VaultPlan
 
-# Ensure output folder exists
-OUTPUT_FOLDER.mkdir(exist_ok=True)
+# Path to your Obsidian vault (see vault_config for the --vault/--snippets options and environment variables)
+VAULT_PATH, OUTPUT_FOLDER = vault_paths()
+IGNORE_FOLDERS = {"Attachments", "Templates", "Prompting", "Journal", "Snippets"}
 
-# Regex to match code blocks
-CODE_BLOCK_REGEX = re.compile(r"```(\w+)?\n(.*?)```", re.DOTALL)
+MANIFEST_SCOPE = "obsidian_snippets"  # Name this script records processed notes under
+
+log = logging.getLogger("obsidian_snippets")
 
 
 def extract_snippets_and_replace(note_path, relative_path):
-    """Extract code snippets from a note, save them as snippets, and replace with embed links."""
+    """Extract code snippets from a note and replace them with embed links.
+
+    Nothing is written here: returns ``(content, updated_content, snippets)``
+    and the main process plans the note edit and the snippet files, so
+    parallel workers never race on the same snippet file.
+    """
     with open(note_path, "r", encoding="utf-8") as file:
         content = file.read()
 
+    lines, offsets = split_lines(content)
+    blocks = list(iter_code_blocks(content, lines, offsets))
+    if not blocks:
+        return content, content, []
+
     snippets = []
-    updated_content = content
-    for match in CODE_BLOCK_REGEX.finditer(content):
-        language = match.group(1) or "plain"
-        code = match.group(2).strip()
+    embeds = []
+    for block in blocks:
+        language = block.language or "plain"
+        code = block.code.strip()
 
         # Capture context (first 3 lines before the code block)
-        context_lines = content[:match.start()].splitlines()[-3:]
-        context = "\n".join(line.strip() for line in context_lines if line.strip())
-
-        # Create a filename based on the snippet's language and hash of its content
-        file_name = f"{language}_{hash(code)}.md"
-        snippet_path = OUTPUT_FOLDER / file_name
-
-        # Save the snippet
-        with open(snippet_path, "w", encoding="utf-8") as snippet_file:
-            snippet_file.write(f"---\n")
-            snippet_file.write(f"tags: [snippet, {language}]\n")
-            snippet_file.write(f"source-note: [[{relative_path}]]\n")
-            snippet_file.write(f"context: |\n  {context}\n")
-            snippet_file.write(f"---\n\n")
-            snippet_file.write(f"```{language}\n{code}\n```\n")
+        context = "\n".join(block_context(lines, block))
+
+        # Create a filename based on the snippet's language and a stable digest of its content
+        file_name = snippet_filename(language, code)
 
         # Add the snippet metadata to the list
         snippets.append({
@@ -52,38 +58,125 @@ def extract_snippets_and_replace(note_path, relative_path):
         })
 
         # Replace the code block in the note with an embed link
-        embed_link = f"![[Snippets/{file_name}]]"
-        updated_content = updated_content.replace(match.group(0), embed_link, 1)
-
-    # Write the updated note content back to the original file
-    with open(note_path, "w", encoding="utf-8") as file:
-        file.write(updated_content)
-
-    return snippets
-
-
-def scan_vault():
-    """Scan the vault for Markdown files and extract code snippets."""
-    all_snippets = []
-
-    for root, dirs, files in os.walk(VAULT_PATH):
-        # Skip ignored folders
-        dirs[:] = [d for d in dirs if not d.startswith(".") and d not in IGNORE_FOLDERS]
-
-        for file in files:
-            if file.endswith(".md"):
-                note_path = Path(root) / file
-                relative_path = os.path.relpath(note_path, VAULT_PATH)
-                snippets = extract_snippets_and_replace(note_path, relative_path)
-                all_snippets.extend(snippets)
+        embeds.append(f"![[Snippets/{file_name}]]")
+
+    updated_content = splice(content, blocks, embeds)
+    return content, updated_content, snippets
+
+
+def save_snippets(snippets, plan):
+    """Plan snippet files in order; the first note with a given code wins."""
+    for snippet in snippets:
+        snippet_path = OUTPUT_FOLDER / snippet["file_name"]
+
+        # Save the snippet unless identical code was already extracted
+        if snippet_path.exists() or plan.pending(snippet_path) is not None:
+            continue
+        context = snippet["context"].replace("\n", "\n  ")
+        fence = fence_for(snippet["code"])
+        plan.write(
+            snippet_path,
+            f"---\n"
+            f"tags: [snippet, {snippet['language']}]\n"
+            f"source-note: [[{snippet['source']}]]\n"
+            f"context: |\n  {context}\n"
+            f"---\n\n"
+            f"{fence}{snippet['language']}\n{snippet['code']}\n{fence}\n",
+        )
+
+
+def find_notes():
+    """Return (note_path, relative_path) for every Markdown note, in a stable order.
+
+    The snippets folder is excluded by path (see ``vault_manifest.find_notes``);
+    hidden folders and ``IGNORE_FOLDERS`` are skipped on top of that.
+    """
+    notes = []
+    for note_path in find_vault_notes(VAULT_PATH, OUTPUT_FOLDER):
+        relative_path = os.path.relpath(note_path, VAULT_PATH)
+        folders = Path(relative_path).parts[:-1]
+        if any(folder.startswith(".") or folder in IGNORE_FOLDERS for folder in folders):
+            continue
+        notes.append((note_path, relative_path))
+    return notes
+
+
+def _extract_note(note):
+    return extract_snippets_and_replace(*note)
+
+
+def scan_vault(workers=1, incremental=False, apply=False):
+    """Scan the vault for Markdown files and extract code snippets.
+
+    With ``workers`` > 1 the notes are processed by a process pool; results
+    are collected in note order, so the output does not depend on the
+    number of workers. With ``incremental`` only notes changed since the
+    last run are processed. The changes are only printed unless ``apply``
+    is set.
+    """
+    with VaultManifest(VAULT_PATH / MANIFEST_FILENAME) as manifest:
+        with phase("scan"):
+            notes = find_notes()
+            if incremental:
+                changed = set(manifest.changed(MANIFEST_SCOPE, [note_path for note_path, _ in notes]))
+                notes = [note for note in notes if note[0] in changed]
+                log.info("%d notes changed since the last run.", len(notes))
+
+        with phase("parse"):
+            if workers <= 1:
+                results = list(progress(map(_extract_note, notes), "Scanning notes", len(notes)))
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    results = list(progress(
+                        executor.map(_extract_note, notes, chunksize=16), "Scanning notes", len(notes),
+                    ))
+        count("files_read", len(notes))
+
+        plan = VaultPlan(VAULT_PATH)
+        with phase("rewrite"):
+            for (note_path, _), (content, updated_content, _) in zip(notes, results):
+                plan.write(note_path, updated_content, original=content)
+            all_snippets = [snippet for _, _, snippets in results for snippet in snippets]
+            save_snippets(all_snippets, plan)
+
+        plan.summary()
+        if not apply:
+            log.info("Dry run: nothing was written. Run again with --apply to make these changes.")
+            return all_snippets
+        plan.apply()
+
+        for note_path, _ in notes:
+            manifest.record(MANIFEST_SCOPE, note_path)
+        for file_name in {snippet["file_name"] for snippet in all_snippets}:
+            manifest.record(MANIFEST_SCOPE, OUTPUT_FOLDER / file_name)
 
     return all_snippets
 
 
-def main():
-    print("Scanning vault for code snippets...")
-    snippets = scan_vault()
-    print(f"Found {len(snippets)} snippets. Processed and updated notes successfully.")
+def main(argv=None):
+    global VAULT_PATH, OUTPUT_FOLDER
+    parser = argparse.ArgumentParser(description="Extract code blocks from the vault into snippet files.")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of processes used to scan notes (0 = one per CPU core).",
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Only process notes that changed since the last run.",
+    )
+    parser.add_argument(
+        "--apply", action="store_true",
+        help="Write the planned changes (default: only print them).",
+    )
+    add_vault_arguments(parser)
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args(argv)
+    VAULT_PATH, OUTPUT_FOLDER = vault_paths(args.vault, args.snippets, parser)
+
+    with instrumented(args):
+        log.info("Scanning vault for code snippets...")
+        snippets = scan_vault(args.workers or os.cpu_count(), args.incremental, args.apply)
+        log.info("Found %d snippets.", len(snippets))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+"""Group duplicate snippets into clusters and pick one canonical snippet per cluster.
+
+Snippets are joined with union-find over the similarity graph (exact
+duplicates plus any near-duplicate pairs that should be merged), so
+A ~ B ~ C always ends up in one cluster no matter in which order the pairs
+were found. Each cluster keeps exactly one snippet, chosen by a policy,
+and every other member maps straight to it: the mapping is flat, and no
+snippet is both a key and a target.
+"""
+import os
+
+
+class UnionFind:
+    """Disjoint sets over hashable keys with path halving and union by size."""
+
+    def __init__(self, keys=()):
+        self.parent = {}
+        self.size = {}
+        for key in keys:
+            self.add(key)
+
+    def add(self, key):
+        if key not in self.parent:
+            self.parent[key] = key
+            self.size[key] = 1
+
+    def find(self, key):
+        parent = self.parent
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+
+    def groups(self):
+        """Return the sets with more than one member, each in insertion order."""
+        groups = {}
+        for key in self.parent:
+            groups.setdefault(self.find(key), []).append(key)
+        return [group for group in groups.values() if len(group) > 1]
+
+
+def _mtime(snippet):
+    try:
+        return os.stat(snippet.path).st_mtime_ns
+    except (OSError, TypeError):
+        return 0
+
+
+# Policy name -> sort key builder; the smallest key is kept. Ties fall back
+# to the oldest file, then the name, so the choice is deterministic.
+# ``references`` is keyed by casefolded name, like VaultManifest.embed_counts.
+CANONICAL_POLICIES = {
+    "oldest": lambda snippet, references: (_mtime(snippet), snippet.name),
+    "referenced": lambda snippet, references: (
+        -references.get(snippet.name.casefold(), 0), _mtime(snippet), snippet.name
+    ),
+    "longest": lambda snippet, references: (-len(snippet.code), _mtime(snippet), snippet.name),
+}
+
+
+def cluster_snippets(snippets, pairs):
+    """Return clusters (lists of snippets, in ``snippets`` order) joined by ``pairs`` of names."""
+    union_find = UnionFind(snippet.name for snippet in snippets)
+    for name_a, name_b in pairs:
+        union_find.union(name_a, name_b)
+    by_name = {snippet.name: snippet for snippet in snippets}
+    return [[by_name[name] for name in group] for group in union_find.groups()]
+
+
+def choose_canonical(cluster, policy="referenced", references=None):
+    """Return the snippet a cluster keeps under ``policy``."""
+    key = CANONICAL_POLICIES[policy]
+    references = references or {}
+    return min(cluster, key=lambda snippet: key(snippet, references))
+
+
+def cluster_mapping(clusters, policy="referenced", references=None):
+    """Map every non-canonical snippet name to its cluster's canonical name.
+
+    Returns ``(mapping, canonical_by_cluster)``.
+    """
+    mapping = {}
+    canonical_names = []
+    for cluster in clusters:
+        canonical = choose_canonical(cluster, policy, references)
+        canonical_names.append(canonical.name)
+        for snippet in cluster:
+            if snippet.name != canonical.name:
+                mapping[snippet.name] = canonical.name
+    return mapping, canonical_names
@@ -0,0 +1,135 @@
+"""Parse-once loader for the Snippets folder shared by the snippet scripts.
+
+Each snippet file is read and regex-parsed exactly once into a ``Snippet``
+record. ``load_corpus`` can also keep an on-disk cache keyed by path, mtime
+and size, so repeat runs skip parsing files that have not changed.
+"""
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import NamedTuple
+
+from instrumentation import count
+from note_blocks import filename_language, iter_code_blocks
+
+# Regex to extract YAML metadata from snippet files
+YAML_REGEX = re.compile(r"---(.*?)---", re.DOTALL)
+
+# Default cache file, kept inside the Snippets folder (hidden from Obsidian)
+CACHE_FILENAME = ".snippet_cache.json"
+CACHE_VERSION = 4
+
+NAME_DIGEST_SIZE = 8  # Bytes of BLAKE2b digest in snippet filenames (16 hex chars)
+
+
+class Snippet(NamedTuple):
+    """A parsed snippet file."""
+    path: Path
+    name: str
+    language: str
+    code: str
+    metadata: str
+    code_hash: str
+
+
+def normalize_code(code):
+    """Normalize line endings and surrounding whitespace of a code block."""
+    lines = code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def code_hash(code):
+    """Return the SHA-256 hex digest of normalized code."""
+    return hashlib.sha256(normalize_code(code).encode("utf-8")).hexdigest()
+
+
+def snippet_filename(language, code):
+    """Return the content-addressed filename for a snippet.
+
+    The name is derived from a truncated BLAKE2b digest of the normalized
+    code, so identical code always maps to the same file across runs. A
+    language that is not safe in a filename becomes ``plain``, and ``#``
+    (which starts a heading in an embed link) is spelled ``sharp``.
+    """
+    language = filename_language(language) or "plain"
+    digest = hashlib.blake2b(
+        normalize_code(code).encode("utf-8"), digest_size=NAME_DIGEST_SIZE
+    ).hexdigest()
+    return f"{language}_{digest}.md"
+
+
+def parse_snippet(path, content):
+    """Build a ``Snippet`` from a snippet file's content."""
+    path = Path(path)
+    yaml_match = YAML_REGEX.search(content)
+    block = next(iter_code_blocks(content), None)
+
+    metadata = yaml_match.group(1).strip() if yaml_match else ""
+    language = block.language if block else ""
+    code = block.code.strip() if block else ""
+    return Snippet(path, path.name, language, code, metadata, code_hash(code))
+
+
+def load_snippet(path):
+    """Read and parse a single snippet file."""
+    with open(path, "r", encoding="utf-8") as file:
+        return parse_snippet(path, file.read())
+
+
+def _read_cache(cache_path):
+    """Load cache entries, ignoring missing, corrupt or outdated caches."""
+    try:
+        with open(cache_path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != CACHE_VERSION:
+        return {}
+    return data.get("entries", {})
+
+
+def _write_cache(cache_path, entries):
+    """Write cache entries atomically so a crash never leaves a partial file."""
+    tmp_path = Path(f"{cache_path}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump({"version": CACHE_VERSION, "entries": entries}, file)
+    os.replace(tmp_path, cache_path)
+
+
+def load_corpus(paths, cache_path=None):
+    """Parse every snippet file in ``paths`` once, in order.
+
+    If ``cache_path`` is given, files whose mtime and size match the cache
+    are not read at all, and the cache is refreshed when anything changed.
+    """
+    cache = _read_cache(cache_path) if cache_path else {}
+    changed = False
+    snippets = []
+
+    for path in paths:
+        path = Path(path)
+        key = str(path)
+        stat = path.stat()
+        entry = cache.get(key)
+        if entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            snippets.append(Snippet(path, *entry["snippet"]))
+            count("cache_hits")
+            continue
+
+        snippet = load_snippet(path)
+        snippets.append(snippet)
+        count("files_read")
+        cache[key] = {
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "snippet": list(snippet[1:]),
+        }
+        changed = True
+
+    if cache_path and changed:
+        cache = {key: entry for key, entry in cache.items() if os.path.exists(key)}
+        _write_cache(cache_path, cache)
+
+    return snippets
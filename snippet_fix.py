@@ -1,77 +1,152 @@
+import argparse
+import logging
 import os
-import re
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from front_matter import read_front_matter, split_entries
+from instrumentation import add_instrumentation_arguments, count, instrumented, phase, progress
+from note_blocks import FENCE_REGEX
+from vault_config import add_vault_arguments, vault_paths
+from vault_manifest import MANIFEST_FILENAME, VaultManifest
+from vault_plan import VaultPlan
+
+# Paths (see vault_config for the --vault/--snippets options and environment variables)
+NOTES_PATH, SNIPPETS_PATH = vault_paths()
+
+MANIFEST_SCOPE = "snippet_fix"  # Name this script records processed snippets under
+
+# Keys written by normalize_metadata(); any other keys are kept as they are
+STANDARD_KEYS = ("tags", "source-note", "context")
+
+log = logging.getLogger("snippet_fix")
+
+
+def fence_language(body):
+    """Return the language of the first code fence in a snippet body, if any."""
+    for line in body.splitlines():
+        match = FENCE_REGEX.fullmatch(line)
+        if match:
+            return match.group(3).split()[0] if match.group(3).strip() else ""
+    return ""
+
+
+def normalize_metadata(front_matter, body_start):
+    """Return the snippet's YAML header in the standard format.
+
+    Tags become a block list starting with ``snippet`` (the code fence's
+    language is added if no other tag names one), ``context`` becomes a
+    folded scalar (literal if it spans lines), and unknown keys follow
+    unchanged.
+    """
+    data = front_matter.data
+    tags = data.get("tags") or []
+    if isinstance(tags, str):
+        tags = tags.replace(",", " ").split()
+    tags = ["snippet"] + [tag for tag in dict.fromkeys(tags) if tag and tag != "snippet"]
+    if len(tags) == 1:
+        tags.append(fence_language(body_start) or "unknown")
+
+    source_note = data.get("source-note") or "[[unknown note]]"
+    context = (data.get("context") or "").strip() or "No context available."
+    style = "|" if "\n" in context else ">"
+
+    lines = ["---", "tags:"]
+    lines.extend(f"  - {tag}" for tag in tags)
+    lines.append(f"source-note: {source_note}")
+    lines.append(f"context: {style}")
+    lines.extend(f"  {line}" if line else "" for line in context.split("\n"))
+    for key, _, _, raw_lines in split_entries(front_matter.text):
+        if key not in STANDARD_KEYS:
+            lines.extend(raw_lines)
+    lines.append("---")
+    return "\n".join(lines) + "\n"
 
-# Paths
-SNIPPETS_PATH = Path(r"C:\Users\toddk\Documents\MyBrain\Snippets")
 
-# Regex to extract YAML metadata and code block from snippet files
-YAML_REGEX = re.compile(r"---(.*?)---", re.DOTALL)
-CODE_BLOCK_REGEX = re.compile(r"```.*?\n(.*?)```", re.DOTALL)
-
-
-def extract_metadata_and_code(snippet_path):
-    """Extract metadata and code from a snippet file."""
-    with open(snippet_path, "r", encoding="utf-8") as file:
+def fix_snippet_metadata(snippet_path):
+    """Normalize a snippet's header, reading only its prefix when nothing changes.
+
+    Returns None if the file is already normalized, otherwise
+    ``(original_content, fixed_content)``. The body is kept byte for byte.
+    """
+    front_matter = read_front_matter(snippet_path)
+    body_start = front_matter.head[len(front_matter.raw):].decode("utf-8", errors="ignore")
+    header = normalize_metadata(front_matter, body_start).encode("utf-8")
+    if header == front_matter.raw:
+        return None
+
+    with open(snippet_path, "rb") as file:
         content = file.read()
-        yaml_match = YAML_REGEX.search(content)
-        code_match = CODE_BLOCK_REGEX.search(content)
-
-        metadata = yaml_match.group(1).strip() if yaml_match else ""
-        code = code_match.group(1).strip() if code_match else ""
-        return metadata, code
+    return content.decode("utf-8"), (header + content[len(front_matter.raw):]).decode("utf-8")
 
 
-def fix_snippet_metadata(snippet_path):
-    """Correct the YAML metadata in a snippet file."""
-    metadata, code = extract_metadata_and_code(snippet_path)
-
-    # Parse existing metadata
-    tags = []
-    source_note = ""
-    context = ""
-    
-    if metadata:
-        for line in metadata.splitlines():
-            if line.startswith("tags:"):
-                tags = [tag.strip() for tag in line.replace("tags:", "").split(",")]
-            elif line.startswith("source-note:"):
-                source_note = line.replace("source-note:", "").strip()
-            elif line.startswith("context:"):
-                context = line.replace("context:", "").strip()
-
-    # Correct the metadata format
-    corrected_metadata = (
-        f"---\n"
-        f"tags:\n"
-        f"  - snippet\n"
-        f"  - {tags[1] if len(tags) > 1 else 'unknown'}\n"
-        f"source-note: {source_note if source_note else '[[unknown note]]'}\n"
-        f"context: >\n"
-        f"  {context if context else 'No context available.'}\n"
-        f"---\n"
+def main(argv=None):
+    global NOTES_PATH, SNIPPETS_PATH
+    parser = argparse.ArgumentParser(description="Rewrite snippet metadata into the standard format.")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Only fix snippets that changed since the last run.",
     )
-
-    # Write back corrected metadata and code to the snippet file
-    with open(snippet_path, "w", encoding="utf-8") as file:
-        file.write(corrected_metadata)
-        file.write(f"```{tags[1] if len(tags) > 1 else 'plain'}\n{code}\n```")
-
-    print(f"Fixed metadata for: {snippet_path}")
-
-
-def main():
-    # Ensure the Snippets folder exists
-    if not SNIPPETS_PATH.exists():
-        print(f"Error: The directory {SNIPPETS_PATH} does not exist.")
-        return
-
-    # Process all snippet files
-    for snippet_path in SNIPPETS_PATH.glob("*.md"):
-        print(f"Processing snippet: {snippet_path}")
-        fix_snippet_metadata(snippet_path)
-
-    print("Finished fixing snippet metadata.")
+    parser.add_argument(
+        "--workers", type=int, default=0,
+        help="Number of processes used to read snippets (default 0 = one per CPU core).",
+    )
+    parser.add_argument(
+        "--apply", action="store_true",
+        help="Write the fixed snippets (default: only print which would change).",
+    )
+    add_vault_arguments(parser)
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args(argv)
+    NOTES_PATH, SNIPPETS_PATH = vault_paths(args.vault, args.snippets, parser)
+    workers = args.workers or os.cpu_count()
+
+    with instrumented(args):
+        # Ensure the Snippets folder exists
+        if not SNIPPETS_PATH.exists():
+            log.error("The directory %s does not exist.", SNIPPETS_PATH)
+            return
+
+        with VaultManifest(NOTES_PATH / MANIFEST_FILENAME) as manifest:
+            with phase("scan"):
+                snippet_paths = sorted(SNIPPETS_PATH.glob("*.md"))
+                if args.incremental:
+                    snippet_paths = manifest.changed(MANIFEST_SCOPE, snippet_paths)
+                    log.info("%d snippets changed since the last run.", len(snippet_paths))
+
+            # Normalize all snippet files in one pass; files that are already
+            # normalized are only read up to the end of their header
+            with phase("parse"):
+                if workers <= 1 or len(snippet_paths) <= 1:
+                    results = list(progress(
+                        map(fix_snippet_metadata, snippet_paths), "Reading snippets", len(snippet_paths),
+                    ))
+                else:
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        results = list(progress(
+                            executor.map(fix_snippet_metadata, snippet_paths, chunksize=64),
+                            "Reading snippets", len(snippet_paths),
+                        ))
+            count("files_read", len(snippet_paths))
+
+            plan = VaultPlan(SNIPPETS_PATH)
+            for snippet_path, fixed in zip(snippet_paths, results):
+                if fixed is not None:
+                    plan.write(snippet_path, fixed[1], original=fixed[0])
+
+            changed = len(plan.writes)
+            log.info(
+                "Scanned %d snippets: %d changed, %d skipped (already normalized).",
+                len(snippet_paths), changed, len(snippet_paths) - changed,
+            )
+            plan.summary()
+            if not args.apply:
+                log.info("Dry run: nothing was written. Run again with --apply to make these changes.")
+                return
+            plan.apply()
+            for snippet_path in snippet_paths:
+                manifest.record(MANIFEST_SCOPE, snippet_path)
+
+        log.info("Finished fixing snippet metadata.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,64 @@
+import argparse
+import logging
+
+from instrumentation import add_instrumentation_arguments, instrumented, phase
+from vault_config import add_vault_arguments, vault_paths
+from vault_manifest import MANIFEST_FILENAME, VaultManifest, find_notes
+from vault_plan import VaultPlan
+
+# Paths (see vault_config for the --vault/--snippets options and environment variables)
+NOTES_PATH, SNIPPETS_PATH = vault_paths()
+
+log = logging.getLogger("snippet_gc")
+
+
+def find_orphans(manifest, snippet_paths):
+    """Return the snippet files that no note embeds, according to the embed index.
+
+    Names are compared case-insensitively, as Obsidian resolves links, so a
+    snippet is never deleted while any link could still point at it.
+    """
+    embedded = manifest.embedded_snippet_names()
+    return [snippet_path for snippet_path in snippet_paths if snippet_path.name.casefold() not in embedded]
+
+
+def main(argv=None):
+    global NOTES_PATH, SNIPPETS_PATH
+    parser = argparse.ArgumentParser(description="Delete snippet files that no note embeds any more.")
+    parser.add_argument(
+        "--apply", action="store_true",
+        help="Delete the orphaned snippets (default: only list them).",
+    )
+    add_vault_arguments(parser)
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args(argv)
+    NOTES_PATH, SNIPPETS_PATH = vault_paths(args.vault, args.snippets, parser)
+
+    with instrumented(args):
+        # Ensure the Snippets folder exists
+        if not SNIPPETS_PATH.exists():
+            log.error("The directory %s does not exist.", SNIPPETS_PATH)
+            return
+
+        with VaultManifest(NOTES_PATH / MANIFEST_FILENAME) as manifest:
+            # Only notes changed since the index last saw them are read
+            with phase("scan"):
+                notes_read, notes_removed = manifest.update_embeds(find_notes(NOTES_PATH, SNIPPETS_PATH))
+                log.info("Embed index updated: %d notes read, %d removed.", notes_read, notes_removed)
+
+                snippet_paths = sorted(SNIPPETS_PATH.glob("*.md"))
+                orphans = find_orphans(manifest, snippet_paths)
+            log.info("%d of %d snippets are not embedded by any note.", len(orphans), len(snippet_paths))
+
+        plan = VaultPlan(NOTES_PATH)
+        for snippet_path in orphans:
+            plan.delete(snippet_path)
+        plan.summary()
+        if not args.apply:
+            log.info("Dry run: nothing was deleted. Run again with --apply to delete these snippets.")
+            return
+        plan.apply()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Single-pass rewriting of ``![[Snippets/...]]`` embed links in notes.
+
+Obsidian accepts a link target without ``.md`` and with a ``#heading`` or
+``|alias`` suffix, so targets are reduced to the snippet's filename with
+``snippet_link_name`` before they are looked up.
+"""
+import re
+
+# Regex to extract snippet embed links from notes
+SNIPPET_LINK_REGEX = re.compile(r"!\[\[Snippets/(.*?)\]\]")
+
+
+def split_link_target(target):
+    """'x.md#h|alias' -> ('x.md', '#h|alias')."""
+    cut = min((i for i in (target.find("#"), target.find("|")) if i >= 0), default=len(target))
+    return target[:cut].strip(), target[cut:]
+
+
+def snippet_link_name(target):
+    """Return the snippet filename an embed target points at ('x#h|alias' -> 'x.md')."""
+    name, _ = split_link_target(target)
+    return name if name.lower().endswith(".md") else f"{name}.md"
+
+
+def rewrite_snippet_links(content, mapping):
+    """Replace every embed of a snippet in ``mapping`` with its new name.
+
+    Link targets match ``mapping`` keys in any letter case, as in Obsidian.
+    Returns the updated content and the number of links replaced.
+    """
+    replaced = 0
+    folded = {name.casefold(): new_name for name, new_name in mapping.items()}
+
+    def replace(match):
+        nonlocal replaced
+        new_name = folded.get(snippet_link_name(match.group(1)).casefold())
+        if new_name is None:
+            return match.group(0)
+        replaced += 1
+        return f"![[Snippets/{new_name}{split_link_target(match.group(1))[1]}]]"
+
+    return SNIPPET_LINK_REGEX.sub(replace, content), replaced
+
@@ -0,0 +1,286 @@
+"""Persistent full-text search index over the Snippets folder.
+
+Snippets are stored in a SQLite database in the vault root, with an FTS5
+table over code, context and source note, and plain indexed columns for
+language, tags and source note. ``update`` re-parses only snippet files
+whose mtime or size changed and drops deleted ones, so keeping the index
+current costs one ``stat`` per snippet.
+
+``closest`` finds the most similar snippet to a pasted code block. Each
+snippet's MinHash LSH band keys are stored in an indexed table, so the
+snippets sharing the most bands with the pasted code (an estimate of
+shingle overlap) are fetched directly and checked with ``SnippetMatcher``.
+Only if none of them is similar enough are all snippets within the
+``real_quick_ratio`` length bound scanned.
+
+Usage:
+    python snippet_search.py "read csv" --language python
+    python snippet_search.py --source "My Note"
+    python snippet_search.py --closest block.py --language python
+"""
+import argparse
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from front_matter import parse_front_matter
+from similarity_index import SnippetMatcher, band_keys
+from snippet_corpus import Snippet, load_snippet
+from vault_config import add_vault_arguments, vault_paths
+
+# Paths (see vault_config for the --vault/--snippets options and environment variables)
+NOTES_PATH, SNIPPETS_PATH = vault_paths()
+
+INDEX_FILENAME = ".snippet_search.db"
+CLOSEST_THRESHOLD = 0.6  # Minimum similarity for --closest
+LSH_CANDIDATES = 200  # Snippets sharing the most LSH bands that --closest checks first
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snippets (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    source_note TEXT NOT NULL,
+    context TEXT NOT NULL,
+    code TEXT NOT NULL,
+    code_length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snippets_language ON snippets (language, code_length);
+CREATE INDEX IF NOT EXISTS snippets_source ON snippets (source_note COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS snippet_tags (
+    snippet_id INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (tag, snippet_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS snippet_bands (
+    band_key INTEGER NOT NULL,
+    snippet_id INTEGER NOT NULL,
+    PRIMARY KEY (band_key, snippet_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS snippet_bands_snippet ON snippet_bands (snippet_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS snippets_fts USING fts5(
+    code, context, source_note, tokenize = "unicode61 tokenchars '_'"
+);
+"""
+
+
+def note_name(link):
+    """'[[Folder/My Note.md|alias]]' -> 'My Note'."""
+    name = str(link or "").strip().strip("[]").split("|")[0].split("/")[-1]
+    return name[:-3] if name.lower().endswith(".md") else name
+
+
+def fts_query(text):
+    """Quote each term so user input can't break FTS5 syntax; a trailing '*' keeps prefix search."""
+    terms = []
+    for term in text.split():
+        prefix = term.endswith("*")
+        term = term.rstrip("*").replace('"', '""')
+        if term:
+            terms.append(f'"{term}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+class SnippetSearchIndex:
+    """SQLite FTS5 index of snippet files with language, tag and source-note filters."""
+
+    def __init__(self, db_path):
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def _remove(self, snippet_id):
+        self.connection.execute("DELETE FROM snippets WHERE id = ?", (snippet_id,))
+        self.connection.execute("DELETE FROM snippet_tags WHERE snippet_id = ?", (snippet_id,))
+        self.connection.execute("DELETE FROM snippet_bands WHERE snippet_id = ?", (snippet_id,))
+        self.connection.execute("DELETE FROM snippets_fts WHERE rowid = ?", (snippet_id,))
+
+    def _insert(self, snippet, stat):
+        metadata = parse_front_matter(snippet.metadata)
+        tags = metadata.get("tags") or []
+        if isinstance(tags, str):
+            tags = tags.replace(",", " ").split()
+        source_note = note_name(metadata.get("source-note"))
+        context = str(metadata.get("context") or "").strip()
+
+        snippet_id = self.connection.execute(
+            "INSERT INTO snippets (name, mtime_ns, size, language, source_note, context, code, code_length)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (snippet.name, stat.st_mtime_ns, stat.st_size, snippet.language, source_note,
+             context, snippet.code, len(snippet.code)),
+        ).lastrowid
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO snippet_tags VALUES (?, ?)",
+            [(snippet_id, str(tag)) for tag in tags],
+        )
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO snippet_bands VALUES (?, ?)",
+            [(key, snippet_id) for key in band_keys(snippet.code)],
+        )
+        self.connection.execute(
+            "INSERT INTO snippets_fts (rowid, code, context, source_note) VALUES (?, ?, ?, ?)",
+            (snippet_id, snippet.code, context, source_note),
+        )
+
+    def update(self, snippets_path):
+        """Bring the index in line with the folder; returns (added, updated, removed)."""
+        indexed = {
+            name: (snippet_id, mtime_ns, size)
+            for snippet_id, name, mtime_ns, size in self.connection.execute(
+                "SELECT id, name, mtime_ns, size FROM snippets"
+            )
+        }
+        added = updated = 0
+        seen = set()
+        for path in sorted(Path(snippets_path).glob("*.md")):
+            seen.add(path.name)
+            stat = path.stat()
+            entry = indexed.get(path.name)
+            if entry and entry[1:] == (stat.st_mtime_ns, stat.st_size):
+                continue
+            if entry:
+                self._remove(entry[0])
+                updated += 1
+            else:
+                added += 1
+            self._insert(load_snippet(path), stat)
+
+        removed = [entry[0] for name, entry in indexed.items() if name not in seen]
+        for snippet_id in removed:
+            self._remove(snippet_id)
+        self.connection.commit()
+        return added, updated, len(removed)
+
+    def search(self, query=None, language=None, tag=None, source_note=None, limit=20):
+        """Return ``(name, language, source_note)`` rows, best keyword matches first."""
+        clauses = []
+        params = []
+        if query:
+            sql = (
+                "SELECT s.name, s.language, s.source_note FROM snippets_fts"
+                " JOIN snippets s ON s.id = snippets_fts.rowid WHERE snippets_fts MATCH ?"
+            )
+            params.append(fts_query(query))
+            order = " ORDER BY snippets_fts.rank"
+        else:
+            sql = "SELECT s.name, s.language, s.source_note FROM snippets s WHERE 1"
+            order = " ORDER BY s.name"
+        if language:
+            clauses.append("s.language = ?")
+            params.append(language)
+        if tag:
+            clauses.append("s.id IN (SELECT snippet_id FROM snippet_tags WHERE tag = ?)")
+            params.append(tag)
+        if source_note:
+            clauses.append("s.source_note = ? COLLATE NOCASE")
+            params.append(note_name(source_note))
+
+        sql += "".join(f" AND {clause}" for clause in clauses) + order + " LIMIT ?"
+        params.append(limit)
+        return self.connection.execute(sql, params).fetchall()
+
+    def _best_match(self, code, rows, threshold):
+        matcher = SnippetMatcher(threshold=threshold)
+        for name, snippet_language, snippet_code in rows:
+            matcher.add(Snippet(None, name, snippet_language, snippet_code, "", ""))
+
+        best = None
+        for snippet_language in sorted(matcher.buckets):
+            match = matcher.best_match(code, snippet_language)
+            if match and (best is None or match[1] > best[1]):
+                best = match
+        return (best[0].name, best[1]) if best else None
+
+    def closest(self, code, language=None, threshold=CLOSEST_THRESHOLD):
+        """Return ``(name, similarity)`` for the snippet most similar to ``code``, or None."""
+        code = code.strip()
+        filters = ""
+        params = []
+        # Like SnippetMatcher.best_match, a threshold of 0 or less has no length bound
+        if threshold > 0:
+            filters += " AND code_length BETWEEN ? AND ?"
+            params += [int(len(code) * threshold / (2 - threshold)), int(len(code) * (2 - threshold) / threshold) + 1]
+        if language:
+            filters += " AND language = ?"
+            params.append(language)
+
+        # LSH candidates first
+        keys = band_keys(code)
+        rows = self.connection.execute(
+            "SELECT name, language, code FROM snippets JOIN ("
+            f"SELECT snippet_id, count(*) AS shared FROM snippet_bands WHERE band_key IN ({','.join('?' * len(keys))})"
+            " GROUP BY snippet_id) ON id = snippet_id WHERE 1" + filters + " ORDER BY shared DESC LIMIT ?",
+            keys + params + [LSH_CANDIDATES],
+        )
+        best = self._best_match(code, rows, threshold)
+        if best:
+            return best
+
+        # Fall back to every snippet whose length could reach the threshold
+        rows = self.connection.execute("SELECT name, language, code FROM snippets WHERE 1" + filters, params)
+        return self._best_match(code, rows, threshold)
+
+
+def main(argv=None):
+    global NOTES_PATH, SNIPPETS_PATH
+    parser = argparse.ArgumentParser(description="Search the Snippets folder.")
+    parser.add_argument("query", nargs="*", help="Keywords to search code, context and source note for.")
+    parser.add_argument("--language", help="Only snippets in this language.")
+    parser.add_argument("--tag", help="Only snippets with this tag.")
+    parser.add_argument("--source", help="Only snippets extracted from this note.")
+    parser.add_argument("--limit", type=int, default=20, help="Maximum number of results (default: 20).")
+    parser.add_argument(
+        "--closest", metavar="FILE",
+        help="Find the snippet most similar to the code in FILE ('-' reads stdin).",
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=CLOSEST_THRESHOLD,
+        help=f"Minimum similarity for --closest (default: {CLOSEST_THRESHOLD}).",
+    )
+    parser.add_argument("--no-update", action="store_true", help="Query the index without refreshing it first.")
+    add_vault_arguments(parser)
+    args = parser.parse_args(argv)
+    NOTES_PATH, SNIPPETS_PATH = vault_paths(args.vault, args.snippets, parser)
+
+    with SnippetSearchIndex(NOTES_PATH / INDEX_FILENAME) as index:
+        if not args.no_update:
+            added, updated, removed = index.update(SNIPPETS_PATH)
+            if added or updated or removed:
+                print(f"Index updated: {added} added, {updated} updated, {removed} removed.")
+
+        start = time.perf_counter()
+        if args.closest:
+            if args.closest == "-":
+                code = sys.stdin.read()
+            else:
+                with open(args.closest, "r", encoding="utf-8") as file:
+                    code = file.read()
+            match = index.closest(code, args.language, args.threshold)
+            elapsed = time.perf_counter() - start
+            if match:
+                print(f"{match[0]} (similarity {match[1]:.2f})")
+            else:
+                print(f"No snippet is at least {args.threshold:.0%} similar.")
+        else:
+            rows = index.search(" ".join(args.query), args.language, args.tag, args.source, args.limit)
+            elapsed = time.perf_counter() - start
+            for name, language, source_note in rows:
+                print(f"{name}\t{language}\t{source_note}")
+            print(f"{len(rows)} results.")
+        print(f"Query took {elapsed * 1000:.1f} ms.")
+
+
+if __name__ == "__main__":
+    main()
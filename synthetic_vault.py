@@ -0,0 +1,161 @@
+"""Deterministic synthetic Obsidian vault for benchmarking the snippet scripts.
+
+Generates ``notes`` notes with ``blocks`` code blocks each. A block is an
+exact copy of an earlier block with probability ``duplicates``, a copy
+with one line changed with probability ``near_duplicates``, and new code
+otherwise. A ``snippet_rate`` share of the blocks is written to the
+Snippets folder under a legacy ``language_<int>.md`` name and embedded in
+the note; the rest stay inline for the extraction scripts to find.
+
+The same arguments always produce byte-identical vaults.
+
+Usage:
+    python synthetic_vault.py /tmp/vault --notes 10000 --blocks 3 --duplicates 0.2 --near-duplicates 0.1
+"""
+import argparse
+import random
+from pathlib import Path
+
+FOLDERS = 20  # Notes are spread over this many folders
+LANGUAGES = ("python", "javascript", "bash")
+WORDS = (
+    "alpha", "batch", "cache", "delta", "entry", "fetch", "graph", "index", "queue", "range",
+    "score", "token", "total", "value", "width", "buffer", "config", "parser", "result", "window",
+)
+
+
+def _name(rng):
+    return f"{rng.choice(WORDS)}_{rng.choice(WORDS)}"
+
+
+def _statement(rng, language):
+    target, source, other = _name(rng), _name(rng), _name(rng)
+    number = rng.randrange(1000)
+    if language == "python":
+        return rng.choice((
+            f"{target} = {source} + {number}",
+            f"{target} = [{other} for {other} in {source} if {other} > {number}]",
+            f"{target}.append({source}.get('{other}', {number}))",
+            f"print(f'{{{source}}} {other}: {{{target}}}')",
+        ))
+    if language == "javascript":
+        return rng.choice((
+            f"const {target} = {source} + {number};",
+            f"const {target} = {source}.filter(({other}) => {other} > {number});",
+            f"{target}.push({source}['{other}'] ?? {number});",
+            f"console.log(`${{{source}}} {other}: ${{{target}}}`);",
+        ))
+    return rng.choice((
+        f"{target.upper()}=$(( {source.upper()} + {number} ))",
+        f"grep -c '{other}' \"${source.upper()}\" > {target}.txt",
+        f"echo \"{other}: ${target.upper()}\"",
+    ))
+
+
+def generate_code(rng, language):
+    """Return a new function-sized block of code in ``language``."""
+    body = [_statement(rng, language) for _ in range(rng.randint(4, 12))]
+    name = _name(rng)
+    if language == "python":
+        return "\n".join([f"def {name}({_name(rng)}):"] + [f"    {line}" for line in body])
+    if language == "javascript":
+        return "\n".join([f"function {name}({_name(rng)}) {{"] + [f"  {line}" for line in body] + ["}"])
+    return "\n".join([f"{name}() {{"] + [f"  {line}" for line in body] + ["}"])
+
+
+def near_duplicate(rng, language, code):
+    """Return ``code`` with one line replaced."""
+    lines = code.split("\n")
+    index = rng.randrange(1, len(lines) - (language != "python"))
+    indent = lines[index][:len(lines[index]) - len(lines[index].lstrip())]
+    lines[index] = indent + _statement(rng, language)
+    return "\n".join(lines)
+
+
+def generate_vault(root, notes=1000, blocks=3, duplicates=0.2, near_duplicates=0.1, snippet_rate=0.5, seed=0):
+    """Write the vault under ``root``; returns ``(note_count, snippet_count, block_count)``."""
+    rng = random.Random(seed)
+    root = Path(root)
+    snippets_path = root / "Snippets"
+    snippets_path.mkdir(parents=True, exist_ok=True)
+    for folder in range(FOLDERS):
+        (root / f"Folder {folder:02d}").mkdir(exist_ok=True)
+
+    generated = []  # (language, code) of every block so far
+    snippet_names = set()
+    snippet_count = 0
+    for note in range(notes):
+        note_name = f"Note {note:06d}"
+        parts = [f"# {note_name}\n"]
+        for _ in range(blocks):
+            roll = rng.random()
+            if generated and roll < duplicates:
+                language, code = rng.choice(generated)
+            elif generated and roll < duplicates + near_duplicates:
+                language, code = rng.choice(generated)
+                code = near_duplicate(rng, language, code)
+            else:
+                language = rng.choice(LANGUAGES)
+                code = generate_code(rng, language)
+            generated.append((language, code))
+
+            parts.append(f"Notes on {_name(rng).replace('_', ' ')} for {note_name}.\n")
+            if rng.random() < snippet_rate:
+                snippet_name = f"{language}_{rng.randrange(-2**63, 2**63)}.md"
+                while snippet_name in snippet_names:
+                    snippet_name = f"{language}_{rng.randrange(-2**63, 2**63)}.md"
+                snippet_names.add(snippet_name)
+                (snippets_path / snippet_name).write_text(
+                    f"---\n"
+                    f"tags:\n"
+                    f"  - snippet\n"
+                    f"  - {language}\n"
+                    f"source-note: [[{note_name}]]\n"
+                    f"context: >\n"
+                    f"  Notes on {note_name}.\n"
+                    f"---\n"
+                    f"```{language}\n{code}\n```",
+                    encoding="utf-8",
+                )
+                snippet_count += 1
+                parts.append(f"![[Snippets/{snippet_name}]]\n")
+            else:
+                parts.append(f"```{language}\n{code}\n```\n")
+
+        note_path = root / f"Folder {note % FOLDERS:02d}" / f"{note_name}.md"
+        note_path.write_text("\n".join(parts), encoding="utf-8")
+
+    return notes, snippet_count, len(generated)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic vault for benchmarks.")
+    parser.add_argument("root", help="Folder to create the vault in.")
+    parser.add_argument("--notes", type=int, default=1000, help="Number of notes (default: 1000).")
+    parser.add_argument("--blocks", type=int, default=3, help="Code blocks per note (default: 3).")
+    parser.add_argument(
+        "--duplicates", type=float, default=0.2,
+        help="Share of blocks that copy an earlier block exactly (default: 0.2).",
+    )
+    parser.add_argument(
+        "--near-duplicates", type=float, default=0.1,
+        help="Share of blocks that copy an earlier block with one line changed (default: 0.1).",
+    )
+    parser.add_argument(
+        "--snippet-rate", type=float, default=0.5,
+        help="Share of blocks already extracted to the Snippets folder (default: 0.5).",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+    args = parser.parse_args(argv)
+
+    if Path(args.root).exists() and any(Path(args.root).iterdir()):
+        print(f"Error: The directory {args.root} is not empty.")
+        return
+    notes, snippets, blocks = generate_vault(
+        args.root, args.notes, args.blocks, args.duplicates, args.near_duplicates, args.snippet_rate, args.seed,
+    )
+    print(f"Generated {notes} notes with {blocks} code blocks ({snippets} in snippet files) in {args.root}.")
+
+
+if __name__ == "__main__":
+    main()
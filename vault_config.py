@@ -0,0 +1,53 @@
+"""Vault locations shared by the snippet scripts.
+
+Each path is taken from the command line if given, then from the
+environment (the nearest ``.env`` file from the working directory up is
+loaded with python-dotenv), then from the original default:
+
+    VAULT_PATH     Obsidian vault folder
+    SNIPPETS_PATH  Snippets folder, a folder named Snippets inside the vault
+                   (default: <vault>/Snippets)
+    REPORTS_PATH   Folder for dedup reports and progress (default: the vault's parent)
+"""
+import os
+from pathlib import Path
+
+from dotenv import find_dotenv, load_dotenv
+
+DEFAULT_VAULT_PATH = r"C:\Users\toddk\Documents\MyBrain"
+SNIPPETS_FOLDER = "Snippets"  # Folder name every ![[Snippets/...]] embed points at
+
+load_dotenv(find_dotenv(usecwd=True))
+
+
+def vault_paths(vault=None, snippets=None, parser=None):
+    """Return ``(vault_path, snippets_path)``.
+
+    Notes embed snippets as ``![[Snippets/...]]``, which Obsidian only
+    resolves to a folder named ``Snippets`` inside the vault. With a
+    ``parser``, any other snippets folder is rejected with ``parser.error``.
+    """
+    vault_path = Path(vault or os.environ.get("VAULT_PATH") or DEFAULT_VAULT_PATH)
+    snippets_path = Path(snippets or os.environ.get("SNIPPETS_PATH") or vault_path / "Snippets")
+    if parser is not None:
+        inside = os.path.abspath(snippets_path).startswith(os.path.abspath(vault_path) + os.sep)
+        if snippets_path.name != SNIPPETS_FOLDER or not inside:
+            parser.error(
+                f"the snippets folder must be a folder named {SNIPPETS_FOLDER} inside the vault "
+                f"(notes embed snippets as ![[{SNIPPETS_FOLDER}/...]]): {snippets_path}"
+            )
+    return vault_path, snippets_path
+
+
+def reports_path(vault_path):
+    """Return the folder the dedup report and progress journal go in."""
+    return Path(os.environ.get("REPORTS_PATH") or Path(vault_path).parent)
+
+
+def add_vault_arguments(parser):
+    """Add --vault and --snippets options to a script's argument parser."""
+    parser.add_argument("--vault", help="Obsidian vault folder (env: VAULT_PATH).")
+    parser.add_argument(
+        "--snippets",
+        help="Snippets folder, named Snippets inside the vault (env: SNIPPETS_PATH; default: <vault>/Snippets).",
+    )
@@ -0,0 +1,221 @@
+"""Persistent change manifest shared by the snippet tools.
+
+The manifest is a small SQLite database kept in the vault root. It stores,
+for every note or snippet a tool has seen, its mtime, size, content hash,
+the code blocks it contains and the snippets it embeds. Each tool also
+records which files it has processed (its "scope"), so with
+``--incremental`` a tool only re-reads files that changed since its last run.
+
+The ``embeds`` table is a note <-> snippet index of ``![[Snippets/...]]``
+embeds. ``update_embeds`` re-reads only notes that changed since the index
+last saw them, and every ``record`` with content keeps it current, so
+"which notes embed this snippet" is an indexed lookup instead of a vault scan.
+Obsidian resolves links case-insensitively, so snippet names are stored and
+looked up casefolded.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from collections import Counter
+
+from instrumentation import count
+from note_blocks import iter_code_blocks
+from snippet_corpus import code_hash
+from snippet_links import SNIPPET_LINK_REGEX, snippet_link_name
+
+MANIFEST_FILENAME = ".snippet_manifest.db"
+COMMIT_EVERY = 500  # Records per transaction
+EMBEDS_SCOPE = "embeds"  # Scope under which the embed index tracks notes
+EMBEDS_VERSION = 2  # Bumped when the embed index must be rebuilt (stored as user_version)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    code_blocks TEXT NOT NULL,
+    snippet_links TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS processed (
+    scope TEXT NOT NULL,
+    path TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (scope, path)
+);
+CREATE TABLE IF NOT EXISTS embeds (
+    note TEXT NOT NULL,
+    snippet TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (note, snippet)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS embeds_snippet ON embeds (snippet);
+"""
+
+
+def find_notes(notes_path, snippets_path):
+    """Return every note in the vault outside the Snippets folder, in a stable order."""
+    snippets_path = os.path.abspath(snippets_path)
+    return sorted(
+        path for path in notes_path.rglob("*.md")
+        if not os.path.abspath(path).startswith(snippets_path + os.sep)
+    )
+
+
+class VaultManifest:
+    """Path -> (mtime, size, content hash, code blocks, snippet links) index."""
+
+    def __init__(self, db_path):
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript(SCHEMA)
+        self.pending = 0
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] < EMBEDS_VERSION:
+            # Older indexes stored link targets as written; re-read every note
+            self.connection.execute("DELETE FROM embeds")
+            self.connection.execute("DELETE FROM processed WHERE scope = ?", (EMBEDS_SCOPE,))
+            self.connection.execute(f"PRAGMA user_version = {EMBEDS_VERSION}")
+            self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def _maybe_commit(self):
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY:
+            self.connection.commit()
+            self.pending = 0
+
+    def changed(self, scope, paths):
+        """Return the paths that are new or modified since ``scope`` last processed them."""
+        seen = {
+            path: (mtime_ns, size)
+            for path, mtime_ns, size in self.connection.execute(
+                "SELECT path, mtime_ns, size FROM processed WHERE scope = ?", (scope,)
+            )
+        }
+        changed = []
+        for path in paths:
+            stat = os.stat(path)
+            if seen.get(str(path)) != (stat.st_mtime_ns, stat.st_size):
+                changed.append(path)
+        return changed
+
+    def record(self, scope, path, content=None):
+        """Mark ``path`` as processed by ``scope`` in its current on-disk state.
+
+        If ``content`` is given, the file's hash, code blocks and snippet
+        links are refreshed as well, and so are its rows in the embed index.
+        """
+        stat = os.stat(path)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO processed VALUES (?, ?, ?, ?)",
+            (scope, str(path), stat.st_mtime_ns, stat.st_size),
+        )
+        if content is not None:
+            code_blocks = [
+                [block.language, code_hash(block.code)]
+                for block in iter_code_blocks(content)
+            ]
+            snippet_links = [
+                snippet_link_name(match.group(1)) for match in SNIPPET_LINK_REGEX.finditer(content)
+            ]
+            self.connection.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    str(path),
+                    stat.st_mtime_ns,
+                    stat.st_size,
+                    hashlib.sha256(content.encode("utf-8")).hexdigest(),
+                    json.dumps(code_blocks),
+                    json.dumps(snippet_links),
+                ),
+            )
+            self.refresh_embeds(path, content)
+        self._maybe_commit()
+
+    def refresh_embeds(self, path, content):
+        """Replace a note's rows in the embed index with the embeds in ``content``."""
+        stat = os.stat(path)
+        embeds = Counter(
+            snippet_link_name(match.group(1)).casefold() for match in SNIPPET_LINK_REGEX.finditer(content)
+        )
+        self.connection.execute("DELETE FROM embeds WHERE note = ?", (str(path),))
+        self.connection.executemany(
+            "INSERT INTO embeds VALUES (?, ?, ?)",
+            [(str(path), snippet, count) for snippet, count in embeds.items()],
+        )
+        self.connection.execute(
+            "INSERT OR REPLACE INTO processed VALUES (?, ?, ?, ?)",
+            (EMBEDS_SCOPE, str(path), stat.st_mtime_ns, stat.st_size),
+        )
+
+    def update_embeds(self, note_paths, contents=None):
+        """Bring the embed index up to date with ``note_paths`` (every note in the vault).
+
+        Only new or modified notes are read, and not even those if
+        ``contents`` (note path -> text the caller already read) has them;
+        notes that no longer exist are dropped. Returns
+        ``(notes_read, notes_removed)``.
+        """
+        note_paths = list(note_paths)
+        changed = self.changed(EMBEDS_SCOPE, note_paths)
+        notes_read = 0
+        for path in changed:
+            content = contents.get(path) if contents else None
+            if content is None:
+                with open(path, "r", encoding="utf-8") as file:
+                    content = file.read()
+                count("files_read")
+                notes_read += 1
+            self.refresh_embeds(path, content)
+            self._maybe_commit()
+
+        current = {str(path) for path in note_paths}
+        removed = [
+            path for (path,) in self.connection.execute(
+                "SELECT path FROM processed WHERE scope = ?", (EMBEDS_SCOPE,)
+            )
+            if path not in current
+        ]
+        for path in removed:
+            self.connection.execute("DELETE FROM embeds WHERE note = ?", (path,))
+            self.connection.execute(
+                "DELETE FROM processed WHERE scope = ? AND path = ?", (EMBEDS_SCOPE, path)
+            )
+        self.connection.commit()
+        return notes_read, len(removed)
+
+    def notes_embedding(self, snippet_name):
+        """Return the notes that embed ``snippet_name``, in any letter case."""
+        return [
+            note for (note,) in self.connection.execute(
+                "SELECT note FROM embeds WHERE snippet = ? ORDER BY note", (snippet_name.casefold(),)
+            )
+        ]
+
+    def embedded_snippets(self, note_path):
+        """Return ``{casefolded snippet_name: count}`` for the snippets a note embeds."""
+        return dict(self.connection.execute(
+            "SELECT snippet, count FROM embeds WHERE note = ?", (str(note_path),)
+        ))
+
+    def notes_with_embeds(self):
+        """Return the set of notes that embed at least one snippet."""
+        return {note for (note,) in self.connection.execute("SELECT DISTINCT note FROM embeds")}
+
+    def embedded_snippet_names(self):
+        """Return the set of casefolded snippet names embedded by at least one note."""
+        return {snippet for (snippet,) in self.connection.execute("SELECT DISTINCT snippet FROM embeds")}
+
+    def embed_counts(self):
+        """Return ``{casefolded snippet_name: count}`` of embeds across all notes."""
+        return dict(self.connection.execute("SELECT snippet, SUM(count) FROM embeds GROUP BY snippet"))
@@ -0,0 +1,134 @@
+"""Dry-run planner shared by the scripts that modify the vault.
+
+A script records every file it would write or delete in a ``VaultPlan``
+instead of touching the disk. ``summary`` prints the change set. ``apply``
+writes only files whose content actually changes: every new content goes
+to a hidden temp file next to its target first, and only when all of them
+are written are they moved into place with ``os.replace``, followed by
+the deletions. An interrupted run therefore leaves every file either old
+or new, never half-written.
+"""
+import difflib
+import os
+from pathlib import Path
+
+from instrumentation import count, phase
+
+LIST_LIMIT = 50  # Files listed by summary(); the rest are only counted
+
+
+def read_text(path):
+    """Return a file's text, or None if it does not exist."""
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            content = file.read()
+    except FileNotFoundError:
+        return None
+    count("files_read")
+    return content
+
+
+class VaultPlan:
+    """Planned writes (path -> new content) and deletions for one run."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.writes = {}
+        self.originals = {}
+        self.deletes = []
+
+    def __bool__(self):
+        return bool(self.writes or self.deletes)
+
+    def write(self, path, content, original=None):
+        """Plan writing ``content`` to ``path``; returns False if the file already has it.
+
+        Pass the current ``original`` text if it is already in memory, to
+        save re-reading the file.
+        """
+        path = Path(path)
+        if path in self.writes:
+            original = self.originals[path]
+        elif original is None:
+            original = read_text(path)
+        if content == original:
+            self.writes.pop(path, None)
+            return False
+        self.writes[path] = content
+        self.originals[path] = original
+        return True
+
+    def delete(self, path):
+        """Plan deleting ``path`` if it exists."""
+        path = Path(path)
+        self.writes.pop(path, None)
+        if path.exists() and path not in self.deletes:
+            self.deletes.append(path)
+
+    def pending(self, path):
+        """Return the planned content of ``path``, or None if it is not being written."""
+        return self.writes.get(Path(path))
+
+    def _display(self, path):
+        try:
+            return str(path.relative_to(self.root))
+        except ValueError:
+            return str(path)
+
+    def summary(self):
+        """Print the new, modified and deleted files with per-file line counts."""
+        created = [path for path in self.writes if self.originals[path] is None]
+        modified = [path for path in self.writes if self.originals[path] is not None]
+        print(f"Plan: {len(created)} new, {len(modified)} modified, {len(self.deletes)} deleted files.")
+
+        entries = (
+            [("+", path) for path in created]
+            + [("~", path) for path in modified]
+            + [("-", path) for path in self.deletes]
+        )
+        for marker, path in entries[:LIST_LIMIT]:
+            line = f"  {marker} {self._display(path)}"
+            if marker == "~":
+                added = removed = 0
+                matcher = difflib.SequenceMatcher(
+                    None, self.originals[path].splitlines(), self.writes[path].splitlines(), autojunk=False
+                )
+                for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                    if tag != "equal":
+                        removed += i2 - i1
+                        added += j2 - j1
+                line += f" (+{added} -{removed} lines)"
+            print(line)
+        if len(entries) > LIST_LIMIT:
+            print(f"  ... and {len(entries) - LIST_LIMIT} more")
+
+    def apply(self):
+        """Write the planned files atomically in one batch, then delete.
+
+        Returns the paths that were written.
+        """
+        staged = []
+        with phase("rewrite"):
+            try:
+                for path, content in self.writes.items():
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    tmp_path = path.with_name(f".{path.name}.tmp")
+                    staged.append((tmp_path, path))
+                    with open(tmp_path, "w", encoding="utf-8") as file:
+                        file.write(content)
+            except BaseException:
+                for tmp_path, _ in staged:
+                    tmp_path.unlink(missing_ok=True)
+                raise
+
+            for tmp_path, path in staged:
+                os.replace(tmp_path, path)
+        count("files_written", len(staged))
+
+        with phase("delete"):
+            for path in self.deletes:
+                path.unlink(missing_ok=True)
+        count("files_deleted", len(self.deletes))
+
+        print(f"Applied: wrote {len(staged)} files, deleted {len(self.deletes)}.")
+        return [path for _, path in staged]